@@ -1,12 +1,22 @@
 from .lambda_flask import LambdaFlask
 from .lambda_flask import Response
+from .lambda_flask import StreamingResponse
 from .lambda_flask import Middleware
+from .lambda_flask import HTTPError
+from .json_codec import JsonCodec
+from .batch import BatchProcessor
+from .disk_cache import DiskCache
 
 __version__ = '0.1.0'
 
 __all__ = [
     'LambdaFlask',
     'Response',
+    'StreamingResponse',
     'Middleware',
+    'HTTPError',
+    'JsonCodec',
+    'BatchProcessor',
+    'DiskCache',
     '__version__'
 ]
\ No newline at end of file
@@ -0,0 +1,165 @@
+import asyncio
+import inspect
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from .lambda_flask import get_event_loop
+
+SQS = 'aws:sqs'
+KINESIS = 'aws:kinesis'
+DYNAMODB = 'aws:dynamodb'
+ALLOWED_EVENT_SOURCES = [SQS, KINESIS, DYNAMODB]
+
+DEFAULT_MAX_WORKERS = 8
+
+
+def _source_name(event_source, arn):
+    # arn:aws:sqs:region:account:queue-name
+    # arn:aws:kinesis:region:account:stream/stream-name
+    # arn:aws:dynamodb:region:account:table/table-name/stream/label
+    resource = arn.rsplit(':', 1)[-1]
+    if event_source == SQS:
+        return resource
+    parts = resource.split('/')
+    return parts[1] if len(parts) > 1 else resource
+
+
+def _record_id(event_source, record):
+    if event_source == SQS:
+        return record['messageId']
+    if event_source == KINESIS:
+        return record['kinesis']['sequenceNumber']
+    return record['dynamodb']['SequenceNumber']
+
+
+def _ordering_key(event_source, arn, record):
+    # Records sharing a key must be handled in order; None means independent.
+    if event_source == SQS:
+        if arn.endswith('.fifo'):
+            return record.get('attributes', {}).get('MessageGroupId')
+        return None
+    if event_source == KINESIS:
+        return record['kinesis'].get('partitionKey')
+    return repr(record['dynamodb'].get('Keys'))
+
+
+class BatchProcessor:
+    # Dispatches SQS, Kinesis and DynamoDB Streams batches to handlers registered
+    # per event source (and optionally per queue/stream/table name), runs them
+    # concurrently and returns the partial batch failure response so only the
+    # failed records are retried. Requires ReportBatchItemFailures on the
+    # event source mapping.
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, enable_logging=True):
+        self.handlers = {}
+        self.max_workers = max_workers
+        self.enable_logging = enable_logging
+        self.executor = None
+        self.resolved_handlers = {}
+        self.logger = logging.getLogger(__name__)
+
+    def register(self, event_source, func, source_name=None):
+        if event_source not in ALLOWED_EVENT_SOURCES:
+            raise ValueError("Event Source Not Allowed")
+        self.handlers[(event_source, source_name)] = func
+        self.resolved_handlers = {}
+
+    def record_decorator(self, event_source, source_name=None):
+        def decorator(func):
+            self.register(event_source, func, source_name)
+            return func
+
+        return decorator
+
+    def get_handler(self, event_source, arn):
+        key = (event_source, arn)
+        if key not in self.resolved_handlers:
+            handler = self.handlers.get((event_source, _source_name(event_source, arn)))
+            if handler is None:
+                handler = self.handlers.get((event_source, None))
+            self.resolved_handlers[key] = handler
+        return self.resolved_handlers[key]
+
+    def _plan(self, records):
+        # Splits the batch into units that run concurrently; records inside a
+        # unit run sequentially and stop at the first failure.
+        units = []
+        groups = {}
+        for record in records:
+            event_source = record.get('eventSource')
+            if event_source not in ALLOWED_EVENT_SOURCES:
+                raise ValueError(f"Event Source Not Allowed: {event_source}")
+            arn = record.get('eventSourceARN', '')
+            handler = self.get_handler(event_source, arn)
+            ordering_key = _ordering_key(event_source, arn, record) if handler is not None else None
+            if ordering_key is None:
+                units.append((handler, event_source, [record]))
+                continue
+            group_key = (event_source, arn, ordering_key)
+            unit = groups.get(group_key)
+            if unit is None:
+                unit = groups[group_key] = (handler, event_source, [])
+                units.append(unit)
+            unit[2].append(record)
+        return units
+
+    def _failed_from(self, event_source, records, index, error):
+        record_id = _record_id(event_source, records[index])
+        if self.enable_logging:
+            self.logger.error("Batch - Record %s failed: %s", record_id, error, exc_info=error)
+        return [record_id] + [_record_id(event_source, record) for record in records[index + 1:]]
+
+    def _run_unit(self, unit):
+        handler, event_source, records = unit
+        for index, record in enumerate(records):
+            try:
+                if handler is None:
+                    raise ValueError(f"No handler registered for {record.get('eventSourceARN')}")
+                handler(record)
+            except Exception as e:
+                return self._failed_from(event_source, records, index, e)
+        return []
+
+    async def _run_async_unit(self, unit, semaphore):
+        handler, event_source, records = unit
+        async with semaphore:
+            for index, record in enumerate(records):
+                try:
+                    await handler(record)
+                except Exception as e:
+                    return self._failed_from(event_source, records, index, e)
+        return []
+
+    async def _run_async_units(self, units):
+        semaphore = asyncio.Semaphore(self.max_workers)
+        return await asyncio.gather(*(self._run_async_unit(unit, semaphore) for unit in units))
+
+    def _get_executor(self):
+        # Created once per container and reused by warm invocations
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                               thread_name_prefix='pylambdapi-batch')
+        return self.executor
+
+    def process(self, event):
+        records = event.get('Records') or []
+        sync_units = []
+        async_units = []
+        for unit in self._plan(records):
+            if inspect.iscoroutinefunction(unit[0]):
+                async_units.append(unit)
+            else:
+                sync_units.append(unit)
+        results = []
+        if len(sync_units) == 1 or (sync_units and self.max_workers == 1):
+            results.extend(self._run_unit(unit) for unit in sync_units)
+        elif sync_units:
+            results.extend(self._get_executor().map(self._run_unit, sync_units))
+        if async_units:
+            results.extend(get_event_loop().run_until_complete(self._run_async_units(async_units)))
+        failed = {record_id for unit_failures in results for record_id in unit_failures}
+        failures = []
+        for record in records:
+            record_id = _record_id(record['eventSource'], record)
+            if record_id in failed:
+                failures.append({'itemIdentifier': record_id})
+        return {'batchItemFailures': failures}
@@ -0,0 +1,45 @@
+# A body parser takes the RequestInfo and returns the dict merged into
+# req_params. Parsers are looked up by exact media type, then "+json" suffix,
+# then "type/*" and finally "*/*".
+
+
+def parse_json(request):
+    data = request.json
+    return data if isinstance(data, dict) else {'body': data}
+
+
+def parse_form(request):
+    return request.form.to_dict()
+
+
+def parse_multipart_form(request):
+    return {**request.form.to_dict(), **request.files.to_dict()}
+
+
+def parse_text(request):
+    return {'body': request.text}
+
+
+def parse_binary(request):
+    if request.is_base64_encoded:
+        return {'base64': True, 'file': request.body}
+    return {'body': request.body}
+
+
+DEFAULT_BODY_PARSERS = {
+    'application/json': parse_json,
+    'application/x-www-form-urlencoded': parse_form,
+    'multipart/form-data': parse_multipart_form,
+    'text/*': parse_text,
+    '*/*': parse_binary,
+}
+
+
+def find_body_parser(parsers, mimetype):
+    parser = parsers.get(mimetype)
+    if parser is None:
+        if mimetype.endswith('+json'):
+            parser = parsers.get('application/json')
+        if parser is None:
+            parser = parsers.get(mimetype.split('/', 1)[0] + '/*') or parsers.get('*/*')
+    return parser
@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_CACHE_SIZE = 256
+CACHEABLE_METHODS = ('GET', 'HEAD')
+DEFAULT_REFRESH_WORKERS = 2
+# Seconds of the invocation kept free after a background refresh must finish
+REFRESH_TIME_MARGIN = 0.5
+
+
+class CachePolicy:
+    # Per-route cache settings. query_params=None varies on the whole query
+    # string, a list on just those parameters; headers lists the request
+    # headers the response depends on. For stale_while_revalidate seconds after
+    # the TTL an entry is still served while it is refreshed in the background.
+    __slots__ = ('ttl', 'query_params', 'headers', 'stale_while_revalidate')
+
+    def __init__(self, ttl, query_params=None, headers=(), stale_while_revalidate=0):
+        if ttl <= 0:
+            raise ValueError("Cache TTL must be positive")
+        if stale_while_revalidate < 0:
+            raise ValueError("stale_while_revalidate must not be negative")
+        self.ttl = ttl
+        self.query_params = tuple(query_params) if query_params is not None else None
+        self.headers = tuple(headers)
+        self.stale_while_revalidate = stale_while_revalidate
+
+    def vary(self, request):
+        query = request.query
+        if self.query_params is None:
+            query_key = tuple(sorted((name, tuple(query.getall(name))) for name in query))
+        else:
+            query_key = tuple(tuple(query.getall(name)) for name in self.query_params)
+        headers = request.headers
+        return query_key, tuple(headers.get(name) for name in self.headers)
+
+
+def _header_values(result, name):
+    values = []
+    for header_name, value in (result.get('headers') or {}).items():
+        if header_name.lower() == name:
+            values.append(value)
+    for header_name, multi in (result.get('multiValueHeaders') or {}).items():
+        if header_name.lower() == name:
+            values.extend(multi)
+    return values
+
+
+def is_storable(result):
+    # Results that set cookies or opt out with Cache-Control private/no-store
+    # belong to one client and are never shared through the cache
+    if result.get('cookies') or _header_values(result, 'set-cookie'):
+        return False
+    for value in _header_values(result, 'cache-control'):
+        directives = {directive.strip().split('=', 1)[0].lower() for directive in value.split(',')}
+        if 'private' in directives or 'no-store' in directives:
+            return False
+    return True
+
+
+def as_cache_policy(cache):
+    # route_decorator(cache=60), cache={'ttl': 60, 'query_params': ['page']} or a CachePolicy
+    if cache is None or isinstance(cache, CachePolicy):
+        return cache
+    if isinstance(cache, (int, float)) and not isinstance(cache, bool):
+        return CachePolicy(cache)
+    if isinstance(cache, dict):
+        return CachePolicy(**cache)
+    raise ValueError("cache must be a TTL in seconds, a dict or a CachePolicy")
+
+
+class ResponseCache:
+    # Bounded LRU of serialized proxy results with a TTL per entry. It lives on
+    # the LambdaFlask instance, so it survives warm invocations of a container.
+    # Entries are (result, expires_at, stale_until); background refreshes write
+    # from worker threads, hence the lock.
+    def __init__(self, max_entries=DEFAULT_CACHE_SIZE, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.clock = clock
+        self.entries = OrderedDict()
+        self.refreshing = set()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.refreshes = 0
+
+    def lookup(self, key):
+        # Returns (result, stale); result is None on a miss
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            result, expires_at, stale_until = entry
+            now = self.clock()
+            if stale_until <= now:
+                del self.entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None, False
+            self.entries.move_to_end(key)
+            stale = expires_at <= now
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            return dict(result), stale
+
+    def get(self, key):
+        result, stale = self.lookup(key)
+        return None if stale else result
+
+    def set(self, key, result, ttl, stale_ttl=0):
+        # Stored as a copy so the caller can keep mutating what it returns
+        with self.lock:
+            expires_at = self.clock() + ttl
+            self.entries[key] = (dict(result), expires_at, expires_at + stale_ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def begin_refresh(self, key):
+        # Single-flight: only the first caller per key gets True
+        with self.lock:
+            if key in self.refreshing:
+                return False
+            self.refreshing.add(key)
+            self.refreshes += 1
+            return True
+
+    def end_refresh(self, key):
+        with self.lock:
+            self.refreshing.discard(key)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'refreshes': self.refreshes,
+        }
+
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,122 @@
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_CONTENT_TYPES = (
+    'text/',
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/x-www-form-urlencoded',
+    'image/svg+xml',
+)
+COMPRESSIBLE_SUFFIXES = ('+json', '+xml')
+
+DEFAULT_COMPRESSION_LEVEL = 6
+DEFAULT_COMPRESSION_THRESHOLD = 1024
+
+
+def _supported_encodings():
+    encodings = ['gzip', 'deflate']
+    if brotli is not None:
+        encodings.insert(0, 'br')
+    return encodings
+
+
+SUPPORTED_ENCODINGS = _supported_encodings()
+
+
+def is_compressible(content_type):
+    if not content_type:
+        return True
+    content_type = content_type.split(';', 1)[0].strip().lower()
+    return content_type.startswith(COMPRESSIBLE_CONTENT_TYPES) or content_type.endswith(COMPRESSIBLE_SUFFIXES)
+
+
+def negotiate_encoding(accept_encoding, encodings=SUPPORTED_ENCODINGS):
+    # Picks the server-preferred encoding among those the client accepts with q > 0.
+    if not accept_encoding:
+        return None
+    accepted = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.partition(';')
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+    wildcard = accepted.get('*')
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = accepted.get(encoding, wildcard)
+        if quality and quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(data, encoding, level=DEFAULT_COMPRESSION_LEVEL):
+    if encoding == 'gzip':
+        compressor = zlib.compressobj(min(level, 9), zlib.DEFLATED, 31)
+        return compressor.compress(data) + compressor.flush()
+    if encoding == 'deflate':
+        return zlib.compress(data, min(level, 9))
+    if encoding == 'br' and brotli is not None:
+        return brotli.compress(data, quality=min(level, 11))
+    raise ValueError(f"Unsupported content encoding: {encoding}")
+
+
+DEFAULT_MAX_BODY_SIZE = 10 * 1024 * 1024
+DECOMPRESS_CHUNK_SIZE = 64 * 1024
+
+# Window bits for zlib.decompressobj: 47 auto-detects the gzip/zlib header,
+# 15 is a zlib stream (HTTP "deflate"), -15 is a raw deflate stream.
+_DECOMPRESS_WBITS = {
+    'gzip': 47,
+    'x-gzip': 47,
+    'deflate': 15,
+}
+
+
+class DecompressionLimitExceeded(ValueError):
+    pass
+
+
+def decompress(data, encoding, max_size=DEFAULT_MAX_BODY_SIZE):
+    # Inflates at most DECOMPRESS_CHUNK_SIZE bytes per step and stops as soon as
+    # the output would exceed max_size, so a small bomb cannot exhaust memory.
+    wbits = _DECOMPRESS_WBITS.get(encoding)
+    if wbits is None:
+        raise ValueError(f"Unsupported content encoding: {encoding}")
+    if encoding == 'deflate' and data[:1] and data[0] & 0x0F != 8:
+        wbits = -15  # some clients send raw deflate without the zlib header
+    decompressor = zlib.decompressobj(wbits)
+    chunks = []
+    total = 0
+    pending = data
+    while pending:
+        chunk = decompressor.decompress(pending, DECOMPRESS_CHUNK_SIZE)
+        total += len(chunk)
+        if max_size is not None and total > max_size:
+            raise DecompressionLimitExceeded(f"Decompressed body exceeds {max_size} bytes")
+        chunks.append(chunk)
+        pending = decompressor.unconsumed_tail
+        if decompressor.eof:
+            break
+    if not decompressor.eof:
+        chunk = decompressor.flush()
+        total += len(chunk)
+        if max_size is not None and total > max_size:
+            raise DecompressionLimitExceeded(f"Decompressed body exceeds {max_size} bytes")
+        chunks.append(chunk)
+        if not decompressor.eof:
+            raise ValueError("Truncated compressed body")
+    return b''.join(chunks)
@@ -0,0 +1,84 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Headers a 304 repeats from the full response (RFC 9110, section 15.4.5)
+NOT_MODIFIED_HEADERS = frozenset(('cache-control', 'content-location', 'date', 'etag', 'expires', 'last-modified',
+                                  'vary'))
+
+
+def body_hash(data):
+    # xxhash when installed, blake2b from the stdlib otherwise
+    if xxhash is not None:
+        return xxhash.xxh3_128_hexdigest(data)
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def make_etag(data):
+    return f'"{body_hash(data)}"'
+
+
+def quote_etag(tag):
+    # Version tags from a route's etag= callable may be given bare
+    tag = str(tag)
+    if tag.startswith('"') or tag.startswith('W/"'):
+        return tag
+    return f'"{tag}"'
+
+
+def weaken_etag(etag):
+    return etag if etag.startswith('W/') else 'W/' + etag
+
+
+def etag_matches(if_none_match, etag):
+    # If-None-Match uses the weak comparison: W/"x" matches "x"
+    if if_none_match.strip() == '*':
+        return True
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def to_timestamp(value):
+    # Naive datetimes are taken as UTC
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return float(value)
+
+
+def http_date(value):
+    return formatdate(to_timestamp(value), usegmt=True)
+
+
+def parse_http_date(value):
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return to_timestamp(parsed)
+
+
+def is_not_modified(request_headers, etag, last_modified):
+    # RFC 9110, section 13.2.2: If-None-Match wins; If-Modified-Since is only
+    # evaluated without it. last_modified is the response's header value.
+    if_none_match = request_headers.get('if-none-match')
+    if if_none_match is not None:
+        return etag is not None and etag_matches(if_none_match, etag)
+    if_modified_since = request_headers.get('if-modified-since')
+    if if_modified_since is None or last_modified is None:
+        return False
+    since = parse_http_date(if_modified_since)
+    modified = parse_http_date(last_modified)
+    return since is not None and modified is not None and int(modified) <= since
@@ -0,0 +1,114 @@
+from collections.abc import Mapping
+from urllib.parse import parse_qs
+
+
+class MultiValueView(Mapping):
+    # Read-only view over the single- and multi-value dicts of an event, without
+    # copying either. Lookups return the first value, getall() every value.
+    # For payload 2.0 events, where repeated query keys arrive comma-joined,
+    # rawQueryString is parsed on demand to split them.
+    __slots__ = ('_single', '_multi', '_raw_query_string', '_parsed')
+
+    def __init__(self, single=None, multi=None, raw_query_string=None):
+        self._single = single
+        self._multi = multi
+        self._raw_query_string = raw_query_string
+        self._parsed = None
+
+    def _parse_raw_query_string(self):
+        if self._parsed is None:
+            self._parsed = parse_qs(self._raw_query_string, keep_blank_values=True)
+        return self._parsed
+
+    def __getitem__(self, key):
+        multi = self._multi
+        if multi is not None:
+            values = multi[key]
+            if not values:
+                raise KeyError(key)
+            return values[0]
+        if self._single is None:
+            raise KeyError(key)
+        value = self._single[key]
+        if self._raw_query_string and ',' in value:
+            values = self._parse_raw_query_string().get(key)
+            if values:
+                return values[0]
+        return value
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def getall(self, key, default=None):
+        multi = self._multi
+        if multi is not None:
+            values = multi.get(key)
+            return list(values) if values else ([] if default is None else default)
+        if self._single is None or key not in self._single:
+            return [] if default is None else default
+        if self._raw_query_string:
+            values = self._parse_raw_query_string().get(key)
+            if values:
+                return values
+        return [self._single[key]]
+
+    def __contains__(self, key):
+        source = self._multi if self._multi is not None else self._single
+        return source is not None and key in source
+
+    def __iter__(self):
+        source = self._multi if self._multi is not None else self._single
+        return iter(source or ())
+
+    def __len__(self):
+        source = self._multi if self._multi is not None else self._single
+        return len(source) if source else 0
+
+    def to_dict(self):
+        return {key: self[key] for key in self}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+
+class Headers(MultiValueView):
+    # Case-insensitive view over event or response headers. Names the caller
+    # spells exactly as stored (function URL and HTTP API events are lowercase)
+    # hit the wrapped dict directly; the lowercase index is only built on the
+    # first lookup that misses.
+    __slots__ = ('_index',)
+
+    def __init__(self, single=None, multi=None):
+        MultiValueView.__init__(self, single, multi)
+        self._index = None
+
+    def _key(self, name):
+        source = self._multi if self._multi is not None else self._single
+        if not source:
+            return None
+        if name in source:
+            return name
+        index = self._index
+        if index is None:
+            index = self._index = {}
+            for key in source:
+                index.setdefault(key.lower(), key)
+        return index.get(name.lower())
+
+    def __getitem__(self, name):
+        key = self._key(name)
+        if key is None:
+            raise KeyError(name)
+        return MultiValueView.__getitem__(self, key)
+
+    def getall(self, name, default=None):
+        key = self._key(name)
+        if key is None:
+            return [] if default is None else default
+        return MultiValueView.getall(self, key, default)
+
+    def __contains__(self, name):
+        return self._key(name) is not None
@@ -0,0 +1,229 @@
+import hashlib
+import logging
+import mmap
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from .json_codec import get_json_codec
+
+DEFAULT_DISK_CACHE_DIR = '/tmp/pylambdapi-cache'
+DEFAULT_DISK_CACHE_SIZE = 512 * 1024 * 1024
+DEFAULT_DISK_ENTRY_THRESHOLD = 256 * 1024
+INDEX_FILE = 'index.json'
+# Only files matching this were written by DiskCache: entries and the temp
+# files of entry or index writes. Anything else in the directory is left alone.
+_ENTRY_NAME = re.compile(r'[0-9a-f]{64}')
+_OWN_FILE = re.compile(r'(?:[0-9a-f]{64}\.json|(?:[0-9a-f]{64}\.json|index\.json)\.\d+\.\d+\.tmp)')
+
+logger = logging.getLogger(__name__)
+
+
+class DiskCache:
+    # Second cache tier in Lambda's /tmp, which survives warm invocations (and
+    # restarts of the runtime process) of an execution environment. An entry is
+    # one line of JSON followed by the raw UTF-8 body of the cached response,
+    # both read from an mmap: only the small header goes through the JSON
+    # codec and the body is decoded into its str without an intermediate copy.
+    # The LRU index is persisted with an atomic os.replace so a new process
+    # picks the entries up again. Expiry uses wall-clock time since it has to
+    # survive a process restart.
+    def __init__(self, directory=DEFAULT_DISK_CACHE_DIR, max_bytes=DEFAULT_DISK_CACHE_SIZE,
+                 min_entry_size=DEFAULT_DISK_ENTRY_THRESHOLD, json_codec='auto', clock=time.time):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.min_entry_size = min_entry_size
+        self.json_codec = get_json_codec(json_codec)
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.index = OrderedDict()  # name -> [size, expires_at, stale_until], least recent first
+        self.total_bytes = 0
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _path(self, name):
+        return os.path.join(self.directory, name + '.json')
+
+    @staticmethod
+    def _name(key):
+        return hashlib.sha256(repr(key).encode('utf-8')).hexdigest()
+
+    def _load_index(self):
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        try:
+            with open(index_path, 'rb') as index_file:
+                entries = self._index_entries(self.json_codec.loads(index_file.read()))
+        except FileNotFoundError:
+            entries = []
+        except (OSError, TypeError, ValueError):
+            logger.warning("Disk cache index %s is unreadable, starting empty", index_path)
+            entries = []
+        now = self.clock()
+        for name, size, expires_at, stale_until in entries:
+            path = self._path(name)
+            if stale_until <= now or not os.path.exists(path):
+                self._unlink(path)
+                continue
+            self.index[name] = [size, expires_at, stale_until]
+            self.total_bytes += size
+        # Entries missing from the index and temp files left by a killed process
+        known = {name + '.json' for name in self.index}
+        for filename in os.listdir(self.directory):
+            if filename in known or not _OWN_FILE.fullmatch(filename):
+                continue
+            path = os.path.join(self.directory, filename)
+            if os.path.isfile(path) and not os.path.islink(path):
+                self._unlink(path)
+
+    @staticmethod
+    def _index_entries(entries):
+        # A malformed index is treated like an unreadable one; entries are only
+        # trusted once the whole file checks out
+        checked = []
+        for entry in entries:
+            name, size, expires_at, stale_until = entry
+            if not isinstance(name, str) or not _ENTRY_NAME.fullmatch(name):
+                continue
+            for number in (size, expires_at, stale_until):
+                if isinstance(number, bool) or not isinstance(number, (int, float)):
+                    raise TypeError(f"Invalid disk cache index entry: {entry!r}")
+            checked.append((name, size, expires_at, stale_until))
+        return checked
+
+    def _save_index(self):
+        index_path = os.path.join(self.directory, INDEX_FILE)
+        temp_path = f"{index_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        entries = [[name, *entry] for name, entry in self.index.items()]
+        with open(temp_path, 'w', encoding='utf-8') as index_file:
+            index_file.write(self.json_codec.dumps(entries))
+        os.replace(temp_path, index_path)
+
+    @staticmethod
+    def _unlink(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _read(self, name):
+        with open(self._path(name), 'rb') as entry_file:
+            with mmap.mmap(entry_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                end = mapped.find(b'\n')
+                if end < 0:
+                    raise ValueError("Disk cache entry has no header")
+                view = memoryview(mapped)
+                try:
+                    header = self.json_codec.loads(view[:end])
+                    if not (isinstance(header, list) and len(header) == 2):
+                        raise ValueError("Invalid disk cache entry header")
+                    value, has_body = header
+                    if has_body:
+                        value['body'] = str(view[end + 1:], 'utf-8')
+                    return value
+                finally:
+                    view.release()
+
+    def _encode(self, value):
+        # Compact JSON never contains a raw newline, which ends the header
+        body = value.get('body') if isinstance(value, dict) else None
+        if not isinstance(body, str):
+            return self.json_codec.dumps([value, False]).encode('utf-8'), b''
+        header = {name: item for name, item in value.items() if name != 'body'}
+        return self.json_codec.dumps([header, True]).encode('utf-8'), body.encode('utf-8')
+
+    def lookup(self, key):
+        # Returns (value, stale) like ResponseCache.lookup; value is None on a miss
+        name = self._name(key)
+        with self.lock:
+            entry = self.index.get(name)
+            if entry is None:
+                self.misses += 1
+                return None, False
+            size, expires_at, stale_until = entry
+            now = self.clock()
+            if stale_until <= now:
+                self._remove(name)
+                self.expirations += 1
+                self.misses += 1
+                self._save_index()
+                return None, False
+            self.index.move_to_end(name)
+            stale = expires_at <= now
+        try:
+            value = self._read(name)
+        except (OSError, ValueError):
+            with self.lock:
+                if name in self.index:
+                    self._remove(name)
+                    self._save_index()
+                self.misses += 1
+            return None, False
+        with self.lock:
+            if stale:
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+        return value, stale
+
+    def get(self, key):
+        value, stale = self.lookup(key)
+        return None if stale else value
+
+    def set(self, key, value, ttl, stale_ttl=0):
+        name = self._name(key)
+        header, body = self._encode(value)
+        size = len(header) + 1 + len(body)
+        if size > self.max_bytes:
+            return False
+        path = self._path(name)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as entry_file:
+            entry_file.write(header)
+            entry_file.write(b'\n')
+            entry_file.write(body)
+        with self.lock:
+            os.replace(temp_path, path)
+            if name in self.index:
+                self.total_bytes -= self.index[name][0]
+            expires_at = self.clock() + ttl
+            self.index[name] = [size, expires_at, expires_at + stale_ttl]
+            self.index.move_to_end(name)
+            self.total_bytes += size
+            while self.total_bytes > self.max_bytes:
+                oldest = next(iter(self.index))
+                self._remove(oldest)
+                self.evictions += 1
+            self._save_index()
+        return True
+
+    def _remove(self, name):
+        size = self.index.pop(name)[0]
+        self.total_bytes -= size
+        self._unlink(self._path(name))
+
+    def clear(self):
+        with self.lock:
+            for name in list(self.index):
+                self._remove(name)
+            self._save_index()
+
+    def stats(self):
+        return {
+            'size': len(self.index),
+            'bytes': self.total_bytes,
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+        }
+
+    def __len__(self):
+        return len(self.index)
@@ -0,0 +1,158 @@
+import json
+from collections.abc import Mapping
+
+
+# Lazy dict subclasses such as RequestParams fill themselves in items(); the C
+# encoders of the optional backends iterate dict storage directly and would
+# otherwise see them before they are loaded.
+def _plain_dict(obj):
+    if isinstance(obj, dict) and obj.__class__ is not dict:
+        return dict(obj.items())
+    return obj
+
+
+# Read-only request views (headers, query strings) are Mappings, not dicts
+def _json_default(obj):
+    if isinstance(obj, Mapping):
+        return dict(obj.items())
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _orjson_default(obj):
+    if isinstance(obj, Mapping):
+        return dict(obj.items())
+    if isinstance(obj, str):
+        return str(obj)
+    if isinstance(obj, int):
+        return int(obj)
+    if isinstance(obj, float):
+        return float(obj)
+    if isinstance(obj, list):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# Disk cache entries are decoded from an mmap; stdlib json and ujson only take
+# str/bytes, whereas orjson and msgspec read the buffer without copying it.
+def _as_bytes(data):
+    return data.tobytes() if isinstance(data, memoryview) else data
+
+
+# The optional backends reject some values stdlib json encodes (ints beyond 64
+# bits, ujson on float subclasses); those bodies are encoded by stdlib json
+# instead, which also raises the usual TypeError for anything unsupported.
+_FALLBACK_ERRORS = (TypeError, OverflowError)
+
+
+class JsonCodec:
+    name = 'json'
+
+    def loads(self, data):
+        return json.loads(_as_bytes(data))
+
+    def dumps(self, obj):
+        return json.dumps(obj, default=_json_default)
+
+
+class OrjsonCodec(JsonCodec):
+    name = 'orjson'
+
+    def __init__(self):
+        import orjson
+        self._loads = orjson.loads
+        self._dumps = orjson.dumps
+        # stdlib json turns int/float dict keys into strings, keep that behaviour.
+        # Dates and dataclasses are passed through so they fail as with stdlib
+        # json rather than being encoded by this backend only.
+        self._options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_SUBCLASS
+                         | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS)
+
+    def loads(self, data):
+        return self._loads(data)
+
+    def dumps(self, obj):
+        try:
+            return self._dumps(obj, default=_orjson_default, option=self._options).decode('utf-8')
+        except _FALLBACK_ERRORS:
+            return super().dumps(obj)
+
+
+class MsgspecCodec(JsonCodec):
+    name = 'msgspec'
+
+    def __init__(self):
+        import msgspec
+        self._decoder = msgspec.json.Decoder()
+        self._encoder = msgspec.json.Encoder(enc_hook=_json_default)
+        self._decode_error = msgspec.DecodeError
+
+    def loads(self, data):
+        # Raised as ValueError like the other backends
+        try:
+            return self._decoder.decode(data)
+        except self._decode_error as e:
+            raise ValueError(str(e)) from e
+
+    def dumps(self, obj):
+        try:
+            return self._encoder.encode(_plain_dict(obj)).decode('utf-8')
+        except _FALLBACK_ERRORS:
+            return super().dumps(obj)
+
+
+class UjsonCodec(JsonCodec):
+    name = 'ujson'
+
+    def __init__(self):
+        import ujson
+        self._loads = ujson.loads
+        self._dumps = ujson.dumps
+
+    def loads(self, data):
+        return self._loads(_as_bytes(data))
+
+    def dumps(self, obj):
+        try:
+            return self._dumps(_plain_dict(obj), escape_forward_slashes=False, default=_json_default)
+        except _FALLBACK_ERRORS:
+            return super().dumps(obj)
+
+
+JSON_CODECS = {
+    'orjson': OrjsonCodec,
+    'msgspec': MsgspecCodec,
+    'ujson': UjsonCodec,
+    'json': JsonCodec,
+}
+
+# Order in which 'auto' tries the optional backends before falling back to stdlib json
+AUTO_CODEC_ORDER = ['orjson', 'msgspec', 'ujson', 'json']
+
+
+def available_json_codecs():
+    codecs = []
+    for name in AUTO_CODEC_ORDER:
+        try:
+            codecs.append(JSON_CODECS[name]())
+        except ImportError:
+            continue
+    return codecs
+
+
+def get_json_codec(codec='auto'):
+    if codec is None or codec == 'auto':
+        for name in AUTO_CODEC_ORDER:
+            try:
+                return JSON_CODECS[name]()
+            except ImportError:
+                continue
+    if isinstance(codec, str):
+        if codec not in JSON_CODECS:
+            raise ValueError(f"Unknown JSON codec: {codec}")
+        return JSON_CODECS[codec]()
+    if not (callable(getattr(codec, 'loads', None)) and callable(getattr(codec, 'dumps', None))):
+        raise ValueError("JSON codec must provide loads and dumps")
+    return codec
+
+
+DEFAULT_JSON_CODEC = JsonCodec()
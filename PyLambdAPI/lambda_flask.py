@@ -1,7 +1,76 @@
-import json
+import asyncio
+import inspect
 import logging
 import base64
-ALLOWED_SOURCES = ['function_url', 'api_gateway_proxy']
+import copy
+import threading
+import uuid
+import zlib
+from collections.abc import AsyncIterator, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from types import MappingProxyType
+from urllib.parse import parse_qs, unquote_plus
+from .json_codec import DEFAULT_JSON_CODEC, get_json_codec
+from .datastructures import Headers, MultiValueView
+from .multipart import DEFAULT_SPOOL_SIZE, MultipartError, iter_base64_chunks, parse_content_type, parse_multipart
+from .body_parsers import DEFAULT_BODY_PARSERS, find_body_parser
+from .cache import (CACHEABLE_METHODS, DEFAULT_CACHE_SIZE, DEFAULT_REFRESH_WORKERS, REFRESH_TIME_MARGIN, ResponseCache,
+                    as_cache_policy, is_storable)
+from .disk_cache import DiskCache
+from .streaming import chunk_bytes, write_prelude, write_result
+from .conditional import (NOT_MODIFIED_HEADERS, http_date, is_not_modified, make_etag, quote_etag, weaken_etag)
+from .validation import (compile_validator, parse_float, parse_int, request_schema, schema_fields, swagger_type,
+                         unwrap_optional)
+from .compression import (DEFAULT_COMPRESSION_LEVEL, DEFAULT_COMPRESSION_THRESHOLD, DEFAULT_MAX_BODY_SIZE,
+                          DecompressionLimitExceeded, compress, decompress, is_compressible,
+                          negotiate_encoding)
+ALLOWED_SOURCES = ['function_url', 'api_gateway_proxy', 'http_api', 'alb', 'auto']
+AUTO_RESPONSE_SOURCES = ['api_gateway_proxy', 'http_api', 'alb']
+
+
+_event_loops = threading.local()
+
+
+def get_event_loop():
+    # One loop per thread, created on first use and kept for the lifetime of
+    # the container so warm invocations reuse it instead of asyncio.run().
+    loop = getattr(_event_loops, 'loop', None)
+    if loop is None or loop.is_closed():
+        loop = _event_loops.loop = asyncio.new_event_loop()
+    return loop
+
+
+def _run_on_loop(coroutine_function):
+    def run(*args):
+        return get_event_loop().run_until_complete(coroutine_function(*args))
+    return run
+
+
+def _as_coroutine_function(func):
+    if inspect.iscoroutinefunction(func):
+        return func
+
+    async def wrapper(*args):
+        return func(*args)
+    return wrapper
+
+
+class HTTPError(Exception):
+    def __init__(self, status_code, message):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+
+# Converters take the raw path segment and return the converted value, raising
+# ValueError when the segment does not match so the router can try other routes.
+PATH_CONVERTERS = {
+    'str': str,
+    'int': parse_int,
+    'float': parse_float,
+    'uuid': uuid.UUID,
+}
 
 
 class swagger_generator:
@@ -27,23 +96,25 @@ class swagger_generator:
         self.definitions = self.swagger['definitions']
     def build_swagger_parameters(self,params_dict):
         parameters = []
-        for param_name, param_type in params_dict.items():
-            if isinstance(param_type, dict):
+        for param_name, param_type, required in schema_fields(params_dict) or ():
+            param_type, optional = unwrap_optional(param_type)
+            if schema_fields(param_type) is not None:
                 # Handle nested parameters
                 nested_parameters = self.build_swagger_parameters(param_type)
                 parameters.extend(nested_parameters)
             else:
-                print(
-                    param_type.__str__
-                )
                 # Handle non-nested parameters
-                parameters.append({
+                parameter = {
                     'name': param_name,
                     'in': 'query',
-                    'required': True,
+                    'required': required and not optional,
                     'description': '',
-                    'type': param_type.__name__,
-                })
+                    'type': swagger_type(param_type),
+                }
+                if parameter['type'] == 'array':
+                    item_types = getattr(param_type, '__args__', None)
+                    parameter['items'] = {'type': swagger_type(item_types[0]) if item_types else 'string'}
+                parameters.append(parameter)
         return parameters
     def generate_method_schema(self, method, path, handler):
         schema = {
@@ -71,7 +142,7 @@ class swagger_generator:
                         "$ref": "#/definitions/" + param
                     }
                 elif param == 'req_params':
-                    schema['parameters'] = self.build_swagger_parameters(handler.func.__annotations__[param])
+                    schema['parameters'] = self.build_swagger_parameters(request_schema(handler.func))
         return schema
 
     def add_route(self, path):
@@ -88,58 +159,451 @@ class swagger_generator:
         return self.swagger
 
 
+def _status_description(status_code):
+    try:
+        return f"{status_code} {HTTPStatus(status_code).phrase}"
+    except ValueError:
+        return str(status_code)
+
+
 class Response:
-    def __init__(self, statusCode, body, headers=None, isBase64Encoded=False, isApiGatewayEvent=False):
+    __slots__ = ('statusCode', 'body', 'body_encoded', 'headers', 'multiValueHeaders', 'cookies', 'isApiGatewayEvent')
+
+    def __init__(self, statusCode, body, headers=None, isBase64Encoded=False, isApiGatewayEvent=False, multiValueHeaders=None, cookies=None):
         self.statusCode = statusCode
         self.body = body
         self.body_encoded = isBase64Encoded
         self.headers = headers
+        self.multiValueHeaders = multiValueHeaders
+        self.cookies = cookies
         self.isApiGatewayEvent = isApiGatewayEvent
 
-    def json(self):
-        if self.isApiGatewayEvent:
-            return {
-                'statusCode': self.statusCode,
-                'body': self.body if isinstance(self.body, str) else json.dumps(self.body)
-            }
-        else:
-            return {
-                'statusCode': self.statusCode,
-                'body': self.body
-            }
+    @classmethod
+    def from_result(cls, result):
+        # Handlers may return a Response, a proxy-style dict with a statusCode,
+        # a (async) generator of chunks, any other JSON-able value, a str or
+        # bytes; all end up as a Response.
+        if isinstance(result, StaticResponse):
+            # Shared by every request; middleware gets a copy it may change
+            return result.copy()
+        if isinstance(result, Response):
+            return result
+        if isinstance(result, (Iterator, AsyncIterator)):
+            return StreamingResponse(200, result)
+        if isinstance(result, dict) and 'statusCode' in result:
+            return cls(result['statusCode'], result.get('body'), result.get('headers'),
+                       result.get('isBase64Encoded', False),
+                       multiValueHeaders=result.get('multiValueHeaders'), cookies=result.get('cookies'))
+        return cls(200, result)
+
+    def json(self, json_codec=DEFAULT_JSON_CODEC, source=None, multi_value_headers=False):
+        # source selects the proxy result format: 'api_gateway_proxy' (REST API,
+        # payload 1.0), 'http_api'/'function_url' (payload 2.0) or 'alb'.
+        # multi_value_headers mirrors an ALB target group with multi-value headers on.
+        if source is None:
+            source = 'api_gateway_proxy' if self.isApiGatewayEvent else 'function_url'
+        body = self.body
+        headers = self.headers
+        is_base64_encoded = self.body_encoded
+        if body is None:
+            body = ''
+        elif isinstance(body, (bytes, bytearray, memoryview)):
+            body = base64.b64encode(body).decode('ascii')
+            is_base64_encoded = True
+        elif source != 'function_url' and not isinstance(body, str):
+            body = json_codec.dumps(body)
+            if 'content-type' not in Headers(headers):
+                headers = {**headers, 'Content-Type': 'application/json'} if headers else {'Content-Type': 'application/json'}
+        result = {
+            'statusCode': self.statusCode,
+            'body': body
+        }
+        cookies = self.cookies
+        multi_value = self.multiValueHeaders
+        if source == 'api_gateway_proxy' or (source == 'alb' and multi_value_headers):
+            if cookies:
+                multi_value = dict(multi_value) if multi_value else {}
+                multi_value['Set-Cookie'] = list(multi_value.get('Set-Cookie', ())) + list(cookies)
+            if source == 'alb':
+                # ALB answers with either headers or multiValueHeaders, never both
+                multi_value = {**{name: [value] for name, value in (headers or {}).items()}, **(multi_value or {})}
+                headers = None
+            if multi_value:
+                result['multiValueHeaders'] = multi_value
+        elif multi_value or (cookies and source == 'alb'):
+            # Payload 2.0 and single-value ALB responses have no multiValueHeaders
+            headers = dict(headers) if headers else {}
+            cookies = list(cookies) if cookies else []
+            for name, values in (multi_value or {}).items():
+                if name.lower() == 'set-cookie':
+                    cookies.extend(values)
+                elif name not in headers:
+                    headers[name] = ','.join(values)
+            if source == 'alb':
+                # Cookies cannot be comma-joined (Expires has a comma) and
+                # single-value ALB responses carry one value per header name
+                if len(cookies) > 1:
+                    raise ValueError("ALB responses can only set several cookies with multi-value headers "
+                                     "enabled on the target group")
+                if cookies:
+                    headers['Set-Cookie'] = cookies[0]
+                cookies = None
+        if headers:
+            result['headers'] = headers
+        if cookies and source in ('function_url', 'http_api'):
+            result['cookies'] = list(cookies)
+        if source == 'alb':
+            result['statusDescription'] = _status_description(self.statusCode)
+            result['isBase64Encoded'] = is_base64_encoded
+        elif is_base64_encoded:
+            result['isBase64Encoded'] = True
+        return result
 
     def __str__(self):
         return f"Response(statusCode={self.statusCode}, body={self.body})"
 
 
+class StaticResponse(Response):
+    # A response serialized once per proxy format; json() hands out a shallow
+    # copy of the frozen result so nothing is rebuilt per request. Handlers and
+    # middleware get a copy() instead; once one is changed (a CORS header added
+    # by process_response) its json() serializes it like any other Response.
+    __slots__ = ('json_codec', 'results', 'frozen')
+
+    def __init__(self, response, json_codec=DEFAULT_JSON_CODEC, sources=()):
+        super().__init__(response.statusCode, response.body, response.headers, response.body_encoded,
+                         response.isApiGatewayEvent, response.multiValueHeaders, response.cookies)
+        self.json_codec = json_codec
+        self.results = {}
+        self.frozen = self._state()
+        for source in sources:
+            self._prepare(source, False)
+
+    def _state(self):
+        headers, multi_value, cookies = self.headers, self.multiValueHeaders, self.cookies
+        return (self.statusCode, self.body, self.body_encoded, dict(headers) if headers else None,
+                {name: list(values) for name, values in multi_value.items()} if multi_value else None,
+                list(cookies) if cookies else None)
+
+    def copy(self):
+        response = StaticResponse.__new__(StaticResponse)
+        status_code, body, body_encoded, headers, multi_value, cookies = self.frozen
+        Response.__init__(response, status_code, copy.deepcopy(body) if isinstance(body, (dict, list)) else body,
+                          _copy_state(headers), body_encoded, self.isApiGatewayEvent, _copy_state(multi_value),
+                          _copy_state(cookies))
+        response.json_codec = self.json_codec
+        response.results = self.results
+        response.frozen = self.frozen
+        return response
+
+    def _prepare(self, source, multi_value_headers):
+        result = MappingProxyType(Response.json(self, self.json_codec, source, multi_value_headers))
+        self.results[(source, multi_value_headers)] = result
+        return result
+
+    def json(self, json_codec=None, source=None, multi_value_headers=False):
+        if self._state() != self.frozen:
+            return Response.json(self, self.json_codec, source, multi_value_headers)
+        result = self.results.get((source, multi_value_headers))
+        if result is None:
+            result = self._prepare(source, multi_value_headers)
+        return dict(result)
+
+
+def _copy_state(value):
+    if isinstance(value, dict):
+        return {name: list(item) if isinstance(item, list) else item for name, item in value.items()}
+    return list(value) if isinstance(value, list) else value
+
+
+class StreamingResponse(Response):
+    # The body is an iterator or async iterator of str/bytes chunks.
+    # process_streaming_request writes them out as they are produced;
+    # process_request and json() join them into a regular body.
+    __slots__ = ()
+
+    def __init__(self, statusCode, chunks, headers=None, multiValueHeaders=None, cookies=None):
+        super().__init__(statusCode, chunks, headers, multiValueHeaders=multiValueHeaders, cookies=cookies)
+
+    def iter_bytes(self):
+        chunks = self.body
+        if isinstance(chunks, AsyncIterator):
+            loop = get_event_loop()
+            while True:
+                try:
+                    chunk = loop.run_until_complete(chunks.__anext__())
+                except StopAsyncIteration:
+                    return
+                yield chunk_bytes(chunk)
+        else:
+            for chunk in chunks:
+                yield chunk_bytes(chunk)
+
+    def prelude(self, json_codec=DEFAULT_JSON_CODEC):
+        # Status, headers and cookies in the function URL format, without a body
+        prelude = Response(self.statusCode, None, self.headers, multiValueHeaders=self.multiValueHeaders,
+                           cookies=self.cookies).json(json_codec, 'function_url')
+        del prelude['body']
+        return prelude
+
+    def json(self, json_codec=DEFAULT_JSON_CODEC, source=None, multi_value_headers=False):
+        data = b''.join(self.iter_bytes())
+        content_type = Headers(self.headers).get('content-type')
+        body = data
+        if content_type is None or is_compressible(content_type):
+            try:
+                body = data.decode('utf-8')
+            except UnicodeDecodeError:
+                pass
+        response = Response(self.statusCode, body, self.headers, isApiGatewayEvent=self.isApiGatewayEvent,
+                            multiValueHeaders=self.multiValueHeaders, cookies=self.cookies)
+        return response.json(json_codec, source, multi_value_headers)
+
+
+class Endpoint:
+    # What the dispatch table stores per (method, path): the composed call and
+    # the per-route settings applied to its response. Cached routes with request
+    # middleware, and routes with etag=/last_modified= callables, also get the
+    # onion split in two: guard runs the request hooks before the cache lookup
+    # or version check, respond the handler (or a ready 304) and the response hooks.
+    __slots__ = ('call', 'guard', 'respond', 'compression_level', 'raw', 'cache', 'etag', 'last_modified')
+
+    def __init__(self, call, compression_level=None, raw=False, cache=None, etag=None, last_modified=None,
+                 guard=None, respond=None):
+        self.call = call
+        self.guard = guard
+        self.respond = respond
+        self.compression_level = compression_level
+        self.raw = raw
+        self.cache = cache
+        self.etag = etag
+        self.last_modified = last_modified
+
+
+def _validation_error(message):
+    # Serialized once when the route is registered; every failing request gets
+    # its own Response around it, so middleware cannot change a shared object
+    return DEFAULT_JSON_CODEC.dumps({'error': message})
+
+
+def _validation_response(error):
+    return Response(400, error, {'Content-Type': 'application/json'})
+
+
 class MethodHandler:
-    def __init__(self, func):
+    __slots__ = ('func', 'middlewares', 'compression_level', 'raw', 'cache', 'etag', 'last_modified', 'validator')
+
+    def __init__(self, func, compression_level=None, raw=False, cache=None, etag=None, last_modified=None):
         self.func = func
         self.middlewares = []
+        self.compression_level = compression_level
+        self.raw = raw
+        self.cache = as_cache_policy(cache)
+        # etag=None follows the app setting, True/False turns body hashing on or
+        # off, and a callable returns a version tag computed without the body.
+        if not (etag is None or isinstance(etag, bool) or callable(etag)):
+            raise ValueError("etag must be a bool or a callable returning a version tag")
+        if last_modified is not None and not callable(last_modified):
+            raise ValueError("last_modified must be a callable")
+        self.etag = etag
+        self.last_modified = last_modified
+        # A req_params annotation (dict of name -> type, dataclass or TypedDict)
+        # is compiled once here and checked right before the handler runs.
+        self.validator = None if raw else compile_validator(request_schema(func), _validation_error)
 
     def use_middleware(self, middleware):
-        if not isinstance(middleware, Middleware):
-            raise ValueError("Middleware must be a subclass of Middleware")
-        if not callable(middleware.process_request):
-            raise ValueError("Middleware must be callable")
-        self.middlewares.append(middleware)
+        self.middlewares.append(_check_middleware(middleware))
 
     def execute(self, req_params):
-        for middleware in self.middlewares:
-            req_params = middleware.process_request(req_params)
-            if isinstance(req_params, Response):
-                return req_params.json()
-        return self.func(req_params)
+        return self.compile().call(req_params)
+
+    def compile(self, app_middlewares=()):
+        middlewares = [*app_middlewares, *self.middlewares]
+        if self._is_async(middlewares):
+            return self._compile_async(middlewares)
+        func = self.func
+        validate = self.validator
+        if validate is None:
+            def handle(req_params):
+                return Response.from_result(func(req_params))
+        else:
+            def handle(req_params):
+                error = validate(req_params)
+                if error is not None:
+                    return _validation_response(error)
+                return Response.from_result(func(req_params))
+        # Built inside out: the first app-wide middleware is the outermost layer
+        call = handle
+        for middleware in reversed(middlewares):
+            call = self._wrap_middleware(middleware, call)
+        guard = respond = None
+        layers = self._split_onion_layers(middlewares)
+        if layers is not None:
+            guard, respond = self._split_layers(layers, handle)
+        return self._endpoint(call, guard, respond)
+
+    def _endpoint(self, call, guard=None, respond=None):
+        return Endpoint(call, self.compression_level, self.raw, self.cache, self.etag, self.last_modified,
+                        guard, respond)
+
+    def _split_onion_layers(self, middlewares):
+        # Cached routes need the split onion when a request hook must run before
+        # the lookup; version-tagged routes whenever there is any hook, since
+        # their early 304 has to pass the response hooks as well.
+        layers = [_middleware_hooks(middleware) for middleware in middlewares]
+        if callable(self.etag) or self.last_modified is not None:
+            return layers if any(hook is not None for hooks in layers for hook in hooks) else None
+        if self.cache is None or not any(process_request is not None for process_request, _ in layers):
+            return None
+        return layers
+
+    @staticmethod
+    def _split_layers(layers, handle):
+        # guard followed by respond calls the hooks in the same order as the
+        # onion: a short-circuit at layer i only passes the layers outside it.
+        def guard(req_params):
+            for index, (process_request, _) in enumerate(layers):
+                if process_request is None:
+                    continue
+                req_params = process_request(req_params)
+                if isinstance(req_params, Response):
+                    response = req_params
+                    for _, process_response in reversed(layers[:index]):
+                        if process_response is not None:
+                            response = process_response(response)
+                    return response
+            return req_params
+
+        response_hooks = [process_response for _, process_response in reversed(layers) if process_response is not None]
+
+        def respond(req_params, response=None):
+            if response is None:
+                response = handle(req_params)
+            for process_response in response_hooks:
+                response = process_response(response)
+            return response
+        return guard, respond
+
+    @staticmethod
+    def _split_async_layers(layers, handle):
+        layers = [(process_request and _as_coroutine_function(process_request),
+                   process_response and _as_coroutine_function(process_response))
+                  for process_request, process_response in layers]
+
+        async def guard(req_params):
+            for index, (process_request, _) in enumerate(layers):
+                if process_request is None:
+                    continue
+                req_params = await process_request(req_params)
+                if isinstance(req_params, Response):
+                    response = req_params
+                    for _, process_response in reversed(layers[:index]):
+                        if process_response is not None:
+                            response = await process_response(response)
+                    return response
+            return req_params
+
+        response_hooks = [process_response for _, process_response in reversed(layers) if process_response is not None]
+
+        async def respond(req_params, response=None):
+            if response is None:
+                response = await handle(req_params)
+            for process_response in response_hooks:
+                response = await process_response(response)
+            return response
+        return _run_on_loop(guard), _run_on_loop(respond)
+
+    def _is_async(self, middlewares):
+        if inspect.iscoroutinefunction(self.func):
+            return True
+        for middleware in middlewares:
+            for hook in _middleware_hooks(middleware):
+                if inspect.iscoroutinefunction(hook):
+                    return True
+        return False
+
+    def _compile_async(self, middlewares):
+        func = _as_coroutine_function(self.func)
+        validate = self.validator
+
+        async def handle(req_params):
+            if validate is not None:
+                error = validate(req_params)
+                if error is not None:
+                    return _validation_response(error)
+            return Response.from_result(await func(req_params))
+        call = handle
+        for middleware in reversed(middlewares):
+            call = self._wrap_async_middleware(middleware, call)
+        guard = respond = None
+        layers = self._split_onion_layers(middlewares)
+        if layers is not None:
+            guard, respond = self._split_async_layers(layers, handle)
+        return self._endpoint(_run_on_loop(call), guard, respond)
+
+    @staticmethod
+    def _wrap_middleware(middleware, next_call):
+        # Hooks left at the Middleware defaults are skipped entirely, so a layer
+        # only costs what it actually overrides.
+        process_request, process_response = _middleware_hooks(middleware)
+        has_request_hook = process_request is not None
+        has_response_hook = process_response is not None
+        if has_request_hook and has_response_hook:
+            def call(req_params):
+                req_params = process_request(req_params)
+                if isinstance(req_params, Response):
+                    return req_params
+                return process_response(next_call(req_params))
+        elif has_request_hook:
+            def call(req_params):
+                req_params = process_request(req_params)
+                if isinstance(req_params, Response):
+                    return req_params
+                return next_call(req_params)
+        elif has_response_hook:
+            def call(req_params):
+                return process_response(next_call(req_params))
+        else:
+            call = next_call
+        return call
+
+    @staticmethod
+    def _wrap_async_middleware(middleware, next_call):
+        process_request, process_response = _middleware_hooks(middleware)
+        has_request_hook = process_request is not None
+        has_response_hook = process_response is not None
+        process_request = _as_coroutine_function(process_request)
+        process_response = _as_coroutine_function(process_response)
+        if has_request_hook and has_response_hook:
+            async def call(req_params):
+                req_params = await process_request(req_params)
+                if isinstance(req_params, Response):
+                    return req_params
+                return await process_response(await next_call(req_params))
+        elif has_request_hook:
+            async def call(req_params):
+                req_params = await process_request(req_params)
+                if isinstance(req_params, Response):
+                    return req_params
+                return await next_call(req_params)
+        elif has_response_hook:
+            async def call(req_params):
+                return await process_response(await next_call(req_params))
+        else:
+            call = next_call
+        return call
 
 
 class Route:
+    __slots__ = ('path', 'http_methods', 'methods')
+
     def __init__(self, path, http_methods=None):
         self.path = path
         self.http_methods = http_methods or ['GET']
         self.methods = {}  # Dictionary to store registered methods
 
-    def route(self, http_method, func):
-        self.methods[http_method] = MethodHandler(func)
+    def route(self, http_method, func, **options):
+        self.methods[http_method] = MethodHandler(func, **options)
 
     def use_middleware(self, http_method, middleware):
         if http_method not in self.methods:
@@ -150,10 +614,125 @@ class Route:
         if method in self.methods:
             return self.methods[method].execute(req_params)
         else:
-            return Response(405, 'Method Not Allowed').json()
+            return Response(405, 'Method Not Allowed')
+
+
+class RouteNode:
+    def __init__(self):
+        self.static = {}
+        self.params = []  # (name, converter_name, converter, child), typed converters first
+        self.proxy = None  # (name, route) for a trailing {name+} segment
+        self.route = None
+
+    def insert(self, segments, index, route, converters):
+        if index == len(segments):
+            if self.route is not None and self.route is not route:
+                raise ValueError(f"Route {route.path} conflicts with {self.route.path}")
+            self.route = route
+            return
+        segment = segments[index]
+        if segment.startswith('{') and segment.endswith('}'):
+            name, _, converter_name = segment[1:-1].partition(':')
+            if not name:
+                raise ValueError(f"Empty path parameter in {route.path}")
+            if name.endswith('+'):
+                if converter_name:
+                    raise ValueError(f"Greedy parameter cannot use a converter in {route.path}")
+                if index != len(segments) - 1:
+                    raise ValueError(f"Greedy parameter must be the last segment in {route.path}")
+                if self.proxy is not None and self.proxy[1] is not route:
+                    raise ValueError(f"Route {route.path} conflicts with {self.proxy[1].path}")
+                self.proxy = (name[:-1], route)
+                return
+            converter_name = converter_name or 'str'
+            if converter_name not in converters:
+                raise ValueError(f"Unknown path converter '{converter_name}' in {route.path}")
+            for param_name, param_converter_name, _, child in self.params:
+                if param_name == name and param_converter_name == converter_name:
+                    break
+            else:
+                child = RouteNode()
+                entry = (name, converter_name, converters[converter_name], child)
+                if converter_name == 'str':
+                    self.params.append(entry)
+                else:
+                    position = len(self.params)
+                    while position and self.params[position - 1][1] == 'str':
+                        position -= 1
+                    self.params.insert(position, entry)
+            child.insert(segments, index + 1, route, converters)
+        elif '{' in segment or '}' in segment:
+            raise ValueError(f"Path parameters must span a whole segment in {route.path}")
+        else:
+            child = self.static.get(segment)
+            if child is None:
+                child = self.static[segment] = RouteNode()
+            child.insert(segments, index + 1, route, converters)
+
+    def match(self, segments, index, path_params):
+        if index == len(segments):
+            return self.route
+        segment = segments[index]
+        child = self.static.get(segment)
+        if child is not None:
+            route = child.match(segments, index + 1, path_params)
+            if route is not None:
+                return route
+        if segment:
+            for name, _, converter, child in self.params:
+                try:
+                    value = converter(segment)
+                except ValueError:
+                    continue
+                route = child.match(segments, index + 1, path_params)
+                if route is not None:
+                    path_params[name] = value
+                    return route
+        if self.proxy is not None:
+            rest = '/'.join(segments[index:])
+            if rest:
+                name, route = self.proxy
+                path_params[name] = rest
+                return route
+        return None
+
+
+class Router:
+    # Static paths are resolved with a single dict lookup; templated paths
+    # live in a segment trie so matching cost follows path depth, not the
+    # number of registered routes. Typed segments ({id:int}) are converted
+    # during the same walk, a failed conversion simply does not match.
+    def __init__(self):
+        self.static_routes = {}
+        self.root = RouteNode()
+        self.has_dynamic_routes = False
+        self.converters = dict(PATH_CONVERTERS)
+
+    def add_converter(self, name, converter):
+        if not callable(converter):
+            raise ValueError("Converter must be callable")
+        self.converters[name] = converter
+
+    def add(self, route):
+        if '{' not in route.path:
+            self.static_routes[route.path] = route
+            return
+        self.root.insert(route.path.split('/'), 0, route, self.converters)
+        self.has_dynamic_routes = True
+
+    def match(self, path):
+        route = self.static_routes.get(path)
+        if route is not None or not self.has_dynamic_routes:
+            return route, None
+        path_params = {}
+        route = self.root.match(path.split('/'), 0, path_params)
+        return route, path_params
 
 
 class Middleware:
+    # process_request may return the (possibly modified) params or a Response
+    # to short-circuit; process_response receives and returns a Response.
+    # Responses short-circuited by a layer only pass through the layers outside it.
     def __init__(self, **kwargs):
         self.kwargs = kwargs
 
@@ -163,38 +742,311 @@ class Middleware:
     def default_process_response(self, response, **kwargs):
         return response
 
+    def process_request(self, req_params):
+        return self.default_process_request(req_params)
+
+    def process_response(self, response):
+        return self.default_process_response(response)
+
+
+def _middleware_hooks(middleware):
+    # (process_request, process_response) of a layer, None for a hook left at
+    # the default. Middleware written against the old API only override
+    # default_process_*, which the base process_* forward to.
+    middleware_class = type(middleware)
+    process_request = process_response = None
+    if middleware_class.process_request is not Middleware.process_request:
+        process_request = middleware.process_request
+    elif middleware_class.default_process_request is not Middleware.default_process_request:
+        process_request = middleware.default_process_request
+    if middleware_class.process_response is not Middleware.process_response:
+        process_response = middleware.process_response
+    elif middleware_class.default_process_response is not Middleware.default_process_response:
+        process_response = middleware.default_process_response
+    return process_request, process_response
+
+
+def _check_middleware(middleware):
+    if not isinstance(middleware, Middleware):
+        raise ValueError("Middleware must be a subclass of Middleware")
+    if not callable(middleware.process_request) or not callable(middleware.process_response):
+        raise ValueError("Middleware must be callable")
+    return middleware
+
+
+_UNSET = object()
+
+
+def _loggable(json_codec, value):
+    if isinstance(value, (dict, list)):
+        try:
+            return json_codec.dumps(value)
+        except (TypeError, ValueError):
+            pass
+    return value
+
+
+class RequestParams(dict):
+    # Compatibility shim for handlers that expect the merged params dict. The
+    # merge (and with it body decoding) only happens on first access, and the
+    # lazy RequestInfo stays reachable through `request`.
+    __slots__ = ('request', 'loaded')
+
+    def __init__(self, request):
+        # Seeded with a key that is always part of the merged dict so C code
+        # that short-circuits on an empty dict (json.dumps) still calls items().
+        dict.__init__(self, headers=request.merged_headers())
+        self.request = request
+        self.loaded = False
+
+    def load(self):
+        # Marked loaded only once the merge succeeded: a body that fails to
+        # parse raises its HTTPError on every access instead of leaving {}
+        if not self.loaded:
+            params = self.request.aggregated_params()
+            dict.clear(self)
+            dict.update(self, params)
+            self.loaded = True
+        return self
+
+    def getall(self, key, default=None):
+        # Every value of a repeated query string parameter, e.g. ?id=1&id=2
+        return self.request.query.getall(key, default)
+
+
+def _load_before(name):
+    method = getattr(dict, name)
+
+    def wrapper(self, *args, **kwargs):
+        if not self.loaded:
+            self.load()
+        return method(self, *args, **kwargs)
+    wrapper.__name__ = name
+    return wrapper
+
+
+for _name in ('__getitem__', '__setitem__', '__delitem__', '__contains__', '__iter__',
+              '__reversed__', '__len__', '__eq__', '__ne__', '__repr__', '__or__', '__ior__',
+              'get', 'keys', 'values', 'items', 'pop', 'popitem', 'setdefault', 'update',
+              'copy', 'clear'):
+    setattr(RequestParams, _name, _load_before(_name))
+RequestParams.__hash__ = None
+
+
+class RequestOptions:
+    # Per-app settings shared by every RequestInfo the app creates
+    def __init__(self, json_codec=None, max_body_size=DEFAULT_MAX_BODY_SIZE, spool_size=DEFAULT_SPOOL_SIZE,
+                 body_parsers=None):
+        self.json_codec = json_codec or DEFAULT_JSON_CODEC
+        self.max_body_size = max_body_size
+        self.spool_size = spool_size
+        self.body_parsers = DEFAULT_BODY_PARSERS if body_parsers is None else body_parsers
+
+
+DEFAULT_REQUEST_OPTIONS = RequestOptions()
+
 
 class RequestInfo:
-    def _aggregate_params(self, query_string_params, body, headers, is_base64_encoded):
-        if body and is_base64_encoded:
-            body = {
-                'base64': True,
-                'file': base64.b64decode(body)
-            }
-        elif body:
-            body = json.loads(body) if body else {}
-        params = {**query_string_params, **body}
-        params['headers'] = headers
-        return params
+    __slots__ = ('path', 'http_method', 'query_string_params', 'raw_body', 'raw_headers', 'is_base64_encoded',
+                 'aggregate', 'identity', 'options', 'json_codec', 'source', 'cookies', 'raw_query_string',
+                 'multi_value_query_string_params', 'multi_value_headers', 'multi_value_response', 'path_params',
+                 'req_params', '_query', '_headers', '_mimetype', '_body', '_json', '_form', '_files')
 
-    def __init__(self, path, http_method, query_string_params, body, headers, is_base64_encoded, aggregate=True, identity=None):
+    def __init__(self, path, http_method, query_string_params, body, headers, is_base64_encoded, aggregate=True, identity=None,
+                 options=None, source='function_url', cookies=None, raw_query_string=None,
+                 multi_value_query_string_params=None, multi_value_headers=None, multi_value_response=False):
         self.path = path
         self.http_method = http_method
-        if aggregate:
-            self.req_params = self._aggregate_params(query_string_params, body, headers, is_base64_encoded)
-        else:
-            self.req_params = {
-                'queryStringParameters': query_string_params,
-                'body': body,
-                'headers': headers,
-                'isBase64Encoded': is_base64_encoded
-            }
+        self.query_string_params = query_string_params
+        self.raw_body = body
+        self.raw_headers = headers
+        self.is_base64_encoded = is_base64_encoded
+        self.aggregate = aggregate
         self.identity = identity
+        self.options = options or DEFAULT_REQUEST_OPTIONS
+        self.json_codec = self.options.json_codec
+        self.source = source
+        self.cookies = cookies
+        self.raw_query_string = raw_query_string
+        self.multi_value_query_string_params = multi_value_query_string_params
+        self.multi_value_headers = multi_value_headers
+        self.multi_value_response = multi_value_response
+        self.path_params = None
+        self.req_params = None
+        self._query = None
+        self._headers = None
+        self._mimetype = None
+        self._body = _UNSET
+        self._json = _UNSET
+        self._form = None
+        self._files = None
+
+    @property
+    def query(self):
+        if self._query is None:
+            self._query = MultiValueView(self.query_string_params, self.multi_value_query_string_params,
+                                         self.raw_query_string)
+        return self._query
+
+    @property
+    def headers(self):
+        if self._headers is None:
+            self._headers = Headers(self.raw_headers, self.multi_value_headers)
+        return self._headers
+
+    def _parse_content_type(self):
+        if self._mimetype is None:
+            self._mimetype = parse_content_type(self.headers.get('content-type'))
+        return self._mimetype
+
+    @property
+    def mimetype(self):
+        return self._parse_content_type()[0]
 
-    def log(self, logger):
+    @property
+    def mimetype_params(self):
+        return self._parse_content_type()[1]
+
+    @property
+    def content_encoding(self):
+        encoding = self.headers.get('content-encoding')
+        if encoding:
+            encoding = encoding.strip().lower()
+            if encoding != 'identity':
+                return encoding
+        return None
+
+    @property
+    def body(self):
+        if self._body is _UNSET:
+            body = self.raw_body
+            if not body:
+                self._body = None
+            else:
+                if self.is_base64_encoded:
+                    body = base64.b64decode(body)
+                encoding = self.content_encoding
+                if encoding is not None:
+                    body = self._decompress(body, encoding)
+                self._body = body
+        return self._body
+
+    def _decompress(self, body, encoding):
+        if isinstance(body, str):
+            body = body.encode('latin-1')
+        try:
+            return decompress(body, encoding, self.options.max_body_size)
+        except DecompressionLimitExceeded:
+            raise HTTPError(413, 'Request Entity Too Large')
+        except (ValueError, zlib.error):
+            if encoding not in ('gzip', 'x-gzip', 'deflate'):
+                raise HTTPError(415, f"Unsupported Content-Encoding: {encoding}")
+            raise HTTPError(400, 'Malformed Compressed Body')
+
+    @property
+    def json(self):
+        if self._json is _UNSET:
+            body = self.body
+            try:
+                self._json = self.json_codec.loads(body) if body else {}
+            except ValueError:
+                raise HTTPError(400, 'Malformed JSON Body')
+        return self._json
+
+    @property
+    def text(self):
+        body = self.body
+        if isinstance(body, (bytes, bytearray)):
+            return body.decode(self.mimetype_params.get('charset', 'utf-8'), 'replace')
+        return body or ''
+
+    def _body_chunks(self):
+        # Base64 bodies that were not decoded yet are decoded chunk by chunk
+        if self._body is _UNSET and self.is_base64_encoded and self.content_encoding is None:
+            return iter_base64_chunks(self.raw_body)
+        body = self.body
+        if not body:
+            return ()
+        return (body.encode('utf-8') if isinstance(body, str) else body,)
+
+    def _parse_form(self):
+        fields = {}
+        files = {}
+        mimetype = self.mimetype if self.raw_body else None
+        if mimetype == 'application/x-www-form-urlencoded':
+            fields = parse_qs(self.text, keep_blank_values=True)
+        elif mimetype == 'multipart/form-data':
+            try:
+                for part in parse_multipart(self._body_chunks(), self.mimetype_params.get('boundary'),
+                                            self.options.spool_size):
+                    if part.is_file:
+                        files.setdefault(part.name, []).append(part)
+                    else:
+                        fields.setdefault(part.name, []).append(part.value)
+            except MultipartError as e:
+                raise HTTPError(400, f"Malformed Multipart Body: {e}")
+        self._form = MultiValueView(None, fields)
+        self._files = MultiValueView(None, files)
+
+    @property
+    def form(self):
+        if self._form is None:
+            self._parse_form()
+        return self._form
+
+    @property
+    def files(self):
+        if self._files is None:
+            self._parse_form()
+        return self._files
+
+    def parsed_body(self):
+        if not self.raw_body:
+            return {}
+        mimetype = self.mimetype
+        if not mimetype:
+            # Without a Content-Type, binary bodies are passed through and
+            # anything else is read as JSON as it always has been
+            binary = self.is_base64_encoded and self.content_encoding is None
+            mimetype = 'application/octet-stream' if binary else 'application/json'
+        parser = find_body_parser(self.options.body_parsers, mimetype)
+        return parser(self) if parser is not None else {}
+
+    def aggregated_params(self):
+        if not self.aggregate:
+            return {
+                'queryStringParameters': self.query_string_params,
+                'body': self.raw_body,
+                'headers': self.raw_headers,
+                'isBase64Encoded': self.is_base64_encoded
+            }
+        body = self.parsed_body()
+        query = self.query
+        params = query.to_dict() if query else {}
+        params.update(body)
+        params['headers'] = self.merged_headers()
+        if self.path_params:
+            params.update(self.path_params)
+        return params
+
+    def merged_headers(self):
+        # The merged params keep a plain dict for compatibility: the event's own
+        # dict, rebuilt only when the event carries multiValueHeaders alone
+        # (ALB with multi-value headers on).
+        if self.raw_headers is not None or self.multi_value_headers is None:
+            return self.raw_headers or {}
+        return self.headers.to_dict()
+
+    def log(self, logger, params=True):
         if logger.isEnabledFor(logging.INFO):
+            if not params:
+                logger.info("Request - Method: %s, Path: %s", self.http_method, self.path)
+                return
+            # Loaded up front so a malformed body raises its HTTPError here rather
+            # than inside the JSON encoder, which would swallow it
+            params = self.params().load()
             logger.info("Request - Method: %s, Path: %s, Params: %s",
-                        self.http_method, self.path, self.req_params)
+                        self.http_method, self.path, _loggable(self.json_codec, params))
 
     def route(self):
         return self.path
@@ -203,43 +1055,117 @@ class RequestInfo:
         return self.http_method
 
     def params(self):
+        if self.req_params is None:
+            self.req_params = RequestParams(self)
         return self.req_params
 
 
+class RawRequest:
+    # Handed to raw=True routes instead of req_params: the original event and
+    # the fields routing already needed, without parsing or copying anything.
+    # The lazy RequestInfo stays reachable through `request`.
+    __slots__ = ('event', 'path', 'method', 'body', 'headers', 'is_base64_encoded', 'source', 'path_params', 'request')
+
+    def __init__(self, event, request):
+        self.event = event
+        self.path = request.path
+        self.method = request.http_method
+        self.body = request.raw_body
+        self.headers = request.headers
+        self.is_base64_encoded = request.is_base64_encoded
+        self.source = request.source
+        self.path_params = request.path_params or {}
+        self.request = request
+
+
+def detect_source(event):
+    # Payload 2.0 (HTTP API and function URLs) carries requestContext.http, ALB
+    # carries requestContext.elb and REST API (payload 1.0) a top-level httpMethod.
+    request_context = event.get('requestContext')
+    if request_context:
+        if 'http' in request_context:
+            return 'http_api'
+        if 'elb' in request_context:
+            return 'alb'
+    if 'httpMethod' in event:
+        return 'api_gateway_proxy'
+    raise ValueError("Unrecognized Event Source")
+
+
 class utills:
+    # Stateless; LambdaFlask shares the module-level EVENT_ADAPTER instance.
 
-    def _process_function_url_event(self, event):
-        path = event['requestContext']['http']['path']
-        method = event['requestContext']['http']['method']
-        query_params = event.get('queryStringParameters', {})
-        body = event.get('body', {})
-        isBase64Encoded = event.get('isBase64Encoded', False)
-        headers = event.get('headers', {})
-        return RequestInfo(path=path, http_method=method, query_string_params=query_params, body=body, headers=headers, is_base64_encoded=isBase64Encoded)
+    def _process_function_url_event(self, event, options=None, source='function_url'):
+        http = event['requestContext']['http']
+        return RequestInfo(path=http['path'], http_method=http['method'], query_string_params=event.get('queryStringParameters'),
+                           body=event.get('body'), headers=event.get('headers'), is_base64_encoded=event.get('isBase64Encoded', False),
+                           options=options, source=source, cookies=event.get('cookies'),
+                           raw_query_string=event.get('rawQueryString'))
+
+    def _process_http_api_event(self, event, options=None):
+        # HTTP API payload 2.0 has the same shape as function URL events
+        return self._process_function_url_event(event, options, source='http_api')
 
-    def _process_api_url_event(self, event):
+    def _process_api_url_event(self, event, options=None):
         path = event['path']
         method = event['httpMethod']
-        query_params = event.get('queryStringParameters') if event.get(
-            'queryStringParameters', None) else {}
-        body = event.get('body') if event.get('body', None) else {}
+        query_params = event.get('queryStringParameters')
+        body = event.get('body')
         isBase64Encoded = event.get('isBase64Encoded', False)
-        headers = event.get('headers', {})
+        headers = event.get('headers')
         identity = event.get('requestContext', {}).get('identity', {})
-        return RequestInfo(path=path, http_method=method, query_string_params=query_params, body=body, headers=headers, is_base64_encoded=isBase64Encoded, aggregate=True, identity=identity)
+        return RequestInfo(path=path, http_method=method, query_string_params=query_params, body=body, headers=headers, is_base64_encoded=isBase64Encoded, aggregate=True, identity=identity, options=options,
+                           source='api_gateway_proxy',
+                           multi_value_query_string_params=event.get('multiValueQueryStringParameters'),
+                           multi_value_headers=event.get('multiValueHeaders'))
 
-    def process_event(self, event, type):
+    def _process_alb_event(self, event, options=None):
+        # ALB passes query strings through without decoding them and sends either
+        # headers or multiValueHeaders depending on the target group setting.
+        multi_value_response = 'multiValueHeaders' in event
+        headers = multi_headers = query_params = multi_query_params = None
+        if multi_value_response:
+            multi_headers = event.get('multiValueHeaders') or {}
+            multi_query_params = {unquote_plus(name): [unquote_plus(value) for value in values]
+                                  for name, values in (event.get('multiValueQueryStringParameters') or {}).items()}
+        else:
+            headers = event.get('headers')
+            query_params = {unquote_plus(name): unquote_plus(value)
+                            for name, value in (event.get('queryStringParameters') or {}).items()}
+        return RequestInfo(path=event['path'], http_method=event['httpMethod'], query_string_params=query_params,
+                           body=event.get('body'), headers=headers, is_base64_encoded=event.get('isBase64Encoded', False),
+                           options=options, source='alb',
+                           multi_value_query_string_params=multi_query_params, multi_value_headers=multi_headers,
+                           multi_value_response=multi_value_response)
+
+    def process_event(self, event, type, options=None):
+        if type == 'auto':
+            type = detect_source(event)
         if type == 'function_url':
-            return self._process_function_url_event(event)
+            return self._process_function_url_event(event, options)
         elif type == 'api_gateway_proxy':
-            return self._process_api_url_event(event)
+            return self._process_api_url_event(event, options)
+        elif type == 'http_api':
+            return self._process_http_api_event(event, options)
+        elif type == 'alb':
+            return self._process_alb_event(event, options)
         else:
             raise ValueError("Invalid Type")
 
 
+EVENT_ADAPTER = utills()
+
+
 class LambdaFlask:
-    def __init__(self, source='function_url', enable_request_logging=True, enable_response_logging=True):
+    def __init__(self, source='function_url', enable_request_logging=True, enable_response_logging=True, json_codec='auto',
+                 compression=False, compression_threshold=DEFAULT_COMPRESSION_THRESHOLD,
+                 compression_level=DEFAULT_COMPRESSION_LEVEL, max_body_size=DEFAULT_MAX_BODY_SIZE, middlewares=None,
+                 multipart_spool_size=DEFAULT_SPOOL_SIZE, cache_size=DEFAULT_CACHE_SIZE,
+                 cache_refresh_workers=DEFAULT_REFRESH_WORKERS, disk_cache=None, etag=False):
         self.routes = {}
+        self.middlewares = [_check_middleware(middleware) for middleware in middlewares or []]
+        self.router = Router()
+        self.dispatch_table = None
         self.enable_request_logging = enable_request_logging
         self.enable_response_logging = enable_response_logging
         self.source = source
@@ -248,36 +1174,402 @@ class LambdaFlask:
             raise ValueError("Source Not Allowed")
         if source == 'api_gateway_proxy':
             self.isApiGatewayEvent = True
+        # Format used when a request fails before its source is known
+        self.response_source = 'api_gateway_proxy' if source == 'auto' else source
         self.logger = logging.getLogger(__name__)
+        self.json_codec = get_json_codec(json_codec)
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self.compression_level = compression_level
+        self.max_body_size = max_body_size
+        # Hash GET/HEAD bodies into an ETag on every route that does not set etag=
+        self.etag = etag
+        self.request_options = RequestOptions(self.json_codec, max_body_size, multipart_spool_size,
+                                              dict(DEFAULT_BODY_PARSERS))
+        # Routes registered with cache= share this LRU across warm invocations
+        self.response_cache = ResponseCache(cache_size)
+        # Optional /tmp tier for cached responses of at least disk_cache.min_entry_size
+        if disk_cache is not None and not isinstance(disk_cache, DiskCache):
+            raise ValueError("disk_cache must be a DiskCache")
+        self.disk_cache = disk_cache
+        self.cache_refresh_workers = cache_refresh_workers
+        self.refresh_executor = None
+        self.static_responses = {}
+        self.register_static_response(404, 'Route Not Found')
+        self.register_static_response(405, 'Method Not Allowed')
+        # Unhandled errors answer with a generic body; the exception is logged
+        self.register_static_response(500, {'error': 'Internal Server Error'})
+
+    def register_static_response(self, status_code, body, headers=None):
+        response = self.prepare_response(Response(status_code, body, headers))
+        self.static_responses[status_code] = response
+        return response
+
+    def prepare_response(self, response):
+        sources = AUTO_RESPONSE_SOURCES if self.source == 'auto' else [self.source]
+        return StaticResponse(Response.from_result(response), self.json_codec, sources)
+
+    def static_route(self, path, body, status_code=200, headers=None, http_methods=None):
+        response = self.prepare_response(Response(status_code, body, headers))
+        route = self.route(path, http_methods)
+        for http_method in http_methods or ['GET']:
+            route.route(http_method, lambda req_params: response)
+        return response
+
+    def register_body_parser(self, content_type, parser):
+        # content_type is a media type ('application/xml'), a 'type/*' wildcard
+        # or '*/*'; parser(request) returns the dict merged into req_params.
+        self.request_options.body_parsers[content_type.lower()] = parser
+
+    def use_middleware(self, middleware):
+        self.middlewares.append(_check_middleware(middleware))
+        self.dispatch_table = None
+
+    def add_path_converter(self, name, converter):
+        self.router.add_converter(name, converter)
 
     def route(self, path, http_methods=None):
         if path in self.routes:
             route = self.routes[path]
         else:
             route = Route(path, http_methods)
+            self.router.add(route)
             self.routes[path] = route
+        self.dispatch_table = None
         return route
 
-    def process_request(self, event):
-        response = Response(500, 'Unable To Process Request',
-                            isApiGatewayEvent=self.isApiGatewayEvent)
+    def freeze(self):
+        # Static routes are keyed by (method, path) so a warm request is one
+        # lookup; templated routes are keyed by (method, Route) after matching.
+        dispatch_table = {}
+        for path, route in self.routes.items():
+            key = path if path in self.router.static_routes else route
+            for http_method, handler in route.methods.items():
+                dispatch_table[(http_method, key)] = handler.compile(self.middlewares)
+        self.dispatch_table = dispatch_table
+        return dispatch_table
+
+    def process_request(self, event, context=None):
+        return self._process_request(event, context)
+
+    def process_streaming_request(self, event, stream, context=None):
+        # For function URLs in RESPONSE_STREAM mode: stream needs write(bytes)
+        # and close(). Generator handlers are written chunk by chunk; everything
+        # else (cache hits, errors, regular handlers) goes out in one piece.
         try:
-            req_info = utills().process_event(event, self.source)
-            if self.enable_request_logging:
-                req_info.log(self.logger)
-            if req_info.route() in self.routes:
-                route = self.routes[req_info.route()]
-                response = route.handle_request(
-                    req_info.method(), req_info.params())
-            else:
-                response = Response(
-                    404, 'Route Not Found', isApiGatewayEvent=self.isApiGatewayEvent).json()
+            result = self._process_request(event, context, stream)
+            if result is not None:
+                write_result(stream, result, self.json_codec)
+        finally:
+            stream.close()
+
+    def _process_request(self, event, context=None, stream=None):
+        req_info = None
+        try:
+            req_info = EVENT_ADAPTER.process_event(event, self.source, self.request_options)
+            dispatch_table = self.dispatch_table
+            if dispatch_table is None:
+                dispatch_table = self.freeze()
+            path, method = req_info.route(), req_info.method()
+            endpoint = dispatch_table.get((method, path))
+            path_params = None
+            if endpoint is None:
+                route, path_params = self.router.match(path)
+                endpoint = dispatch_table.get((method, route)) if route is not None else None
+                if endpoint is None:
+                    # Misrouted requests are logged without decoding their body
+                    if self.enable_request_logging:
+                        req_info.log(self.logger, params=False)
+                    return self._finalize_response(self.static_responses[404 if route is None else 405], req_info)
+            req_info.path_params = path_params
+            cache_key = argument = None
+            logged = False
+            if endpoint.cache is not None and method in CACHEABLE_METHODS:
+                cache_key = self._cache_key(endpoint, req_info)
+                if endpoint.guard is not None:
+                    # Request middleware (authentication) runs before the lookup,
+                    # so a rejected request never sees a cached body
+                    if self.enable_request_logging:
+                        req_info.log(self.logger, params=not endpoint.raw)
+                    logged = True
+                    argument = endpoint.guard(self._endpoint_argument(endpoint, req_info, event))
+                    if isinstance(argument, Response):
+                        return self._finalize_response(argument, req_info, endpoint)
+                # Hits are answered before the handler and the response hooks run
+                result, stale = self._cache_lookup(cache_key)
+                if result is not None:
+                    if self.enable_request_logging and not logged:
+                        req_info.log(self.logger, params=False)
+                    if stale:
+                        self._refresh_in_background(cache_key, endpoint, req_info, event, context)
+                    result = self._conditional_result(result, req_info)
+                    if self.enable_response_logging:
+                        self.log_response(result)
+                    return result
+            if self.enable_request_logging and not logged:
+                req_info.log(self.logger, params=not endpoint.raw)
+            return self._call_endpoint(endpoint, req_info, event, cache_key, conditional=True, stream=stream,
+                                       argument=argument)
+        except HTTPError as e:
+            response = self.static_responses.get(e.status_code) or Response(e.status_code, {'error': e.message})
         except Exception as e:
-            response = Response(
-                500, {'error': str(e)}, isApiGatewayEvent=self.isApiGatewayEvent).json()
+            self.logger.exception("Unhandled error in %s %s", req_info.http_method if req_info else None,
+                                  req_info.path if req_info else None)
+            response = self.static_responses.get(500) or Response(500, {'error': str(e)})
+        return self._finalize_response(response, req_info)
+
+    def _call_endpoint(self, endpoint, req_info, event, cache_key=None, conditional=False, stream=None,
+                       argument=None):
+        # argument is set when endpoint.guard already ran the request hooks
+        versioned = req_info.http_method in CACHEABLE_METHODS and (callable(endpoint.etag) or endpoint.last_modified)
+        if argument is None:
+            argument = self._endpoint_argument(endpoint, req_info, event)
+            call = endpoint.call
+            if versioned and endpoint.guard is not None:
+                # Version tags are only computed for requests the middleware let through
+                argument = endpoint.guard(argument)
+                if isinstance(argument, Response):
+                    return self._finalize_response(argument, req_info, endpoint)
+                call = endpoint.respond
+        else:
+            call = endpoint.respond
+        etag = last_modified = None
+        if versioned:
+            etag, last_modified = self._route_validators(endpoint, argument)
+            # A matching version tag is answered before the body is built
+            if conditional and is_not_modified(req_info.headers, etag, last_modified):
+                headers = {name: value for name, value in (('ETag', etag), ('Last-Modified', last_modified))
+                           if value is not None}
+                response = Response(304, None, headers)
+                if endpoint.respond is not None:
+                    response = endpoint.respond(argument, response)
+                return self._finalize_response(response, req_info, endpoint)
+        response = call(argument)
+        if stream is not None and isinstance(response, StreamingResponse):
+            self._stream_response(stream, response)
+            return None
+        result = self._serialize_response(response, req_info, endpoint, etag, last_modified)
+        if cache_key is not None and result.get('statusCode') == 200:
+            self._cache_store(cache_key, result, endpoint.cache)
+        if conditional:
+            result = self._conditional_result(result, req_info)
         if self.enable_response_logging:
-            self.log_response(response)
-        return Response(response.get('statusCode', 500), response.get('body', {}), response.get('headers', {}), response.get('isBase64Encoded', False), self.isApiGatewayEvent).json()
+            self.log_response(result)
+        return result
+
+    @staticmethod
+    def _endpoint_argument(endpoint, req_info, event):
+        return RawRequest(event, req_info) if endpoint.raw else req_info.params()
+
+    def _stream_response(self, stream, response):
+        chunks = response.iter_bytes()
+        # Pulled before the prelude so a handler failing up front still gets a 500
+        first = next(chunks, b'')
+        write_prelude(stream, response.prelude(self.json_codec), self.json_codec)
+        if self.enable_response_logging:
+            self.log_response({'statusCode': response.statusCode, 'body': '<stream>'})
+        if first:
+            stream.write(first)
+        try:
+            for chunk in chunks:
+                stream.write(chunk)
+        except Exception:
+            # The status is already sent; the client sees a truncated body
+            self.logger.exception("Response stream failed after the prelude was sent")
+
+    @staticmethod
+    def _route_validators(endpoint, argument):
+        # etag= and last_modified= callables get the same argument as the handler
+        etag = last_modified = None
+        if callable(endpoint.etag):
+            tag = endpoint.etag(argument)
+            if tag is not None:
+                etag = quote_etag(tag)
+        if endpoint.last_modified is not None:
+            value = endpoint.last_modified(argument)
+            if value is not None:
+                last_modified = http_date(value)
+        return etag, last_modified
+
+    def _conditional_result(self, result, req_info):
+        # Swaps a 200 for an empty 304 when If-None-Match / If-Modified-Since match
+        if result.get('statusCode') != 200:
+            return result
+        request_headers = req_info.headers
+        if 'if-none-match' not in request_headers and 'if-modified-since' not in request_headers:
+            return result
+        _, response_headers = self._response_headers(result, req_info)
+        if not is_not_modified(request_headers, response_headers.get('etag'), response_headers.get('last-modified')):
+            return result
+        headers = {name: value for name, value in (result.get('headers') or {}).items()
+                   if name.lower() in NOT_MODIFIED_HEADERS}
+        multi_value = {name: values for name, values in (result.get('multiValueHeaders') or {}).items()
+                       if name.lower() in NOT_MODIFIED_HEADERS}
+        response = Response(304, None, headers or None, multiValueHeaders=multi_value or None)
+        return response.json(self.json_codec, req_info.source, req_info.multi_value_response)
+
+    def _cache_lookup(self, cache_key):
+        result, stale = self.response_cache.lookup(cache_key)
+        if result is None and self.disk_cache is not None:
+            result, stale = self.disk_cache.lookup(cache_key)
+        return result, stale
+
+    def _body_size(self, result):
+        # Function URL results may carry the body unserialized; only measured on a store
+        body = result.get('body')
+        if body is None:
+            return 0
+        if not isinstance(body, str):
+            body = self.json_codec.dumps(body)
+        return len(body)
+
+    def _cache_store(self, cache_key, result, policy):
+        if not is_storable(result):
+            return
+        # Large bodies go to disk only so they do not sit in memory twice
+        disk_cache = self.disk_cache
+        if disk_cache is not None and self._body_size(result) >= disk_cache.min_entry_size:
+            if disk_cache.set(cache_key, result, policy.ttl, policy.stale_while_revalidate):
+                self.response_cache.discard(cache_key)
+                return
+        self.response_cache.set(cache_key, result, policy.ttl, policy.stale_while_revalidate)
+
+    def _get_refresh_executor(self):
+        # Created once per container; each worker thread gets its own event loop
+        if self.refresh_executor is None:
+            self.refresh_executor = ThreadPoolExecutor(max_workers=self.cache_refresh_workers,
+                                                       thread_name_prefix='pylambdapi-refresh')
+        return self.refresh_executor
+
+    def _refresh_in_background(self, cache_key, endpoint, req_info, event, context):
+        # Lambda freezes the container once the response is returned, so the
+        # refresh only starts when the invocation has time left for it and its
+        # result is dropped if it finishes past that point.
+        clock = self.response_cache.clock
+        deadline = None
+        if context is not None:
+            budget = context.get_remaining_time_in_millis() / 1000 - REFRESH_TIME_MARGIN
+            if budget <= 0:
+                return
+            deadline = clock() + budget
+        if not self.response_cache.begin_refresh(cache_key):
+            return
+
+        def refresh():
+            try:
+                result = self._call_endpoint(endpoint, req_info, event)
+                if result.get('statusCode') == 200 and (deadline is None or clock() <= deadline):
+                    self._cache_store(cache_key, result, endpoint.cache)
+            except Exception:
+                self.logger.exception("Cache refresh failed for %s %s", req_info.http_method, req_info.path)
+            finally:
+                self.response_cache.end_refresh(cache_key)
+        self._get_refresh_executor().submit(refresh)
+
+    def _finalize_response(self, response, req_info=None, endpoint=None):
+        result = self._serialize_response(response, req_info, endpoint)
+        if self.enable_response_logging:
+            self.log_response(result)
+        return result
+
+    def _serialize_response(self, response, req_info=None, endpoint=None, etag=None, last_modified=None):
+        if req_info is None:
+            return response.json(self.json_codec, self.response_source)
+        result = response.json(self.json_codec, req_info.source, req_info.multi_value_response)
+        if endpoint is not None:
+            # The ETag covers the uncompressed body; compress_response weakens it
+            if result.get('statusCode') == 200 and req_info.http_method in CACHEABLE_METHODS:
+                self._add_validators(result, req_info, endpoint, etag, last_modified)
+            level = self._compression_level(endpoint)
+            if level:
+                result = self.compress_response(result, req_info, level)
+        return result
+
+    def _etag_enabled(self, endpoint):
+        return self.etag if endpoint.etag is None else bool(endpoint.etag)
+
+    def _add_validators(self, result, req_info, endpoint, etag, last_modified):
+        # Headers the handler set itself are left alone
+        header_key, response_headers = self._response_headers(result, req_info)
+        updates = {}
+        if 'etag' not in response_headers:
+            if etag is None and self._etag_enabled(endpoint):
+                body = result.get('body')
+                if not isinstance(body, str):
+                    body = self.json_codec.dumps(body)
+                etag = make_etag(body.encode('utf-8'))
+            if etag is not None:
+                updates['ETag'] = etag
+        if last_modified is not None and 'last-modified' not in response_headers:
+            updates['Last-Modified'] = last_modified
+        if updates:
+            self._update_headers(result, header_key, updates)
+
+    @staticmethod
+    def _response_headers(result, req_info):
+        # ALB targets with multi-value headers enabled only get multiValueHeaders
+        if req_info.multi_value_response:
+            return 'multiValueHeaders', Headers(None, result.get('multiValueHeaders'))
+        return 'headers', Headers(result.get('headers'))
+
+    @staticmethod
+    def _update_headers(result, header_key, updates):
+        headers = dict(result.get(header_key) or {})
+        for name, value in updates.items():
+            headers[name] = [value] if header_key == 'multiValueHeaders' else value
+        result[header_key] = headers
+
+    def _compression_level(self, endpoint):
+        level = endpoint.compression_level
+        if level is None and self.compression:
+            level = self.compression_level
+        return level
+
+    def _cache_key(self, endpoint, req_info):
+        # The proxy result differs per event source and negotiated encoding
+        encoding = None
+        if self._compression_level(endpoint):
+            encoding = negotiate_encoding(req_info.headers.get('accept-encoding'))
+        return (req_info.http_method, req_info.path, req_info.source, req_info.multi_value_response, encoding,
+                *endpoint.cache.vary(req_info))
+
+    def compress_response(self, result, req_info, level):
+        body = result.get('body')
+        if not body or result.get('isBase64Encoded'):
+            return result
+        header_key, response_headers = self._response_headers(result, req_info)
+        content_type = response_headers.get('content-type')
+        if 'content-encoding' in response_headers or not is_compressible(content_type):
+            return result
+        serialized = not isinstance(body, str)
+        if serialized:
+            body = self.json_codec.dumps(body)
+        data = body.encode('utf-8')
+        if len(data) < self.compression_threshold:
+            return result
+        encoding = negotiate_encoding(req_info.headers.get('accept-encoding'))
+        if encoding is None:
+            return result
+        compressed = compress(data, encoding, level)
+        if len(compressed) >= len(data):
+            return result
+        vary = ', '.join(response_headers.getall('vary'))
+        updates = {'Content-Encoding': encoding}
+        # Written back under the handler's own spelling so no second Vary appears
+        vary_name = next((name for name in response_headers if name.lower() == 'vary'), 'Vary')
+        updates[vary_name] = f"{vary}, Accept-Encoding" if vary else 'Accept-Encoding'
+        if serialized and not content_type:
+            updates['Content-Type'] = 'application/json'
+        etag = response_headers.get('etag')
+        if etag is not None and not etag.startswith('W/'):
+            # Byte-for-byte equality no longer holds for the encoded body
+            for name in response_headers:
+                if name.lower() == 'etag':
+                    updates[name] = weaken_etag(etag)
+        self._update_headers(result, header_key, updates)
+        result['body'] = base64.b64encode(compressed).decode('ascii')
+        result['isBase64Encoded'] = True
+        return result
 
     def execute_handler(self, handler, req_params):
         return handler(req_params)
@@ -290,16 +1582,18 @@ class LambdaFlask:
             statusCode, body = response.get('statusCode', 500), response.get(
                 'body', 'No Body Recieved in Response')
             self.logger.info(
-                "Response - Status Code: %s, Body: %s", statusCode, body)
+                "Response - Status Code: %s, Body: %s", statusCode, _loggable(self.json_codec, body))
 
-    def route_decorator(self, path, http_methods=None, middlewares=None, **middleware_kwargs):
+    def route_decorator(self, path, http_methods=None, middlewares=None, compression_level=None, raw=False,
+                        cache=None, etag=None, last_modified=None, **middleware_kwargs):
         if middlewares is None:
             middlewares = []
 
         def decorator(func):
             route = self.route(path, http_methods)
             for http_method in http_methods:
-                route.route(http_method, func)
+                route.route(http_method, func, compression_level=compression_level, raw=raw, cache=cache, etag=etag,
+                            last_modified=last_modified)
                 for middleware in middlewares:
                     route.use_middleware(http_method, middleware)
             return func
@@ -0,0 +1,175 @@
+import base64
+import binascii
+import tempfile
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+DEFAULT_SPOOL_SIZE = 1024 * 1024
+MAX_PART_HEADER_SIZE = 16 * 1024
+
+_PREAMBLE, _DELIMITER, _HEADERS, _BODY, _END = range(5)
+
+
+class MultipartError(ValueError):
+    pass
+
+
+def parse_content_type(value):
+    # 'multipart/form-data; boundary="abc"' -> ('multipart/form-data', {'boundary': 'abc'})
+    if not value:
+        return '', {}
+    mime_type, _, rest = value.partition(';')
+    params = {}
+    while rest:
+        item, _, rest = rest.partition(';')
+        key, sep, param = item.partition('=')
+        if not sep:
+            continue
+        param = param.strip()
+        if len(param) >= 2 and param[0] == param[-1] == '"':
+            param = param[1:-1].replace('\\"', '"')
+        params[key.strip().lower()] = param
+    return mime_type.strip().lower(), params
+
+
+def iter_base64_chunks(data, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Decodes about chunk_size bytes at a time so the full decoded body never
+    # has to sit next to the base64 string.
+    step = max(4, chunk_size // 3 * 4)
+    try:
+        for start in range(0, len(data), step):
+            yield base64.b64decode(data[start:start + step])
+    except binascii.Error as e:
+        raise MultipartError(f"Invalid base64 body: {e}")
+
+
+class Part:
+    # One multipart section. Fields keep their bytes in memory; parts with a
+    # filename are written to a SpooledTemporaryFile that moves to disk once it
+    # grows past spool_size.
+    __slots__ = ('name', 'filename', 'content_type', 'charset', 'headers', 'file', 'size', '_data')
+
+    def __init__(self, headers, spool_size=DEFAULT_SPOOL_SIZE):
+        self.headers = headers
+        _, disposition = parse_content_type(headers.get('content-disposition'))
+        self.name = disposition.get('name')
+        self.filename = disposition.get('filename')
+        self.content_type, params = parse_content_type(headers.get('content-type'))
+        self.charset = params.get('charset', 'utf-8')
+        self.size = 0
+        if self.filename is not None:
+            self.file = tempfile.SpooledTemporaryFile(max_size=spool_size)
+            self._data = None
+        else:
+            self.file = None
+            self._data = bytearray()
+
+    @property
+    def is_file(self):
+        return self.file is not None
+
+    @property
+    def value(self):
+        if self.file is not None:
+            return self.read()
+        return self._data.decode(self.charset, 'replace')
+
+    def write(self, data):
+        self.size += len(data)
+        if self.file is not None:
+            self.file.write(data)
+        else:
+            self._data += data
+
+    def finish(self):
+        if self.file is not None:
+            self.file.seek(0)
+
+    def read(self):
+        if self.file is None:
+            return bytes(self._data)
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+    def __repr__(self):
+        return f"Part(name={self.name!r}, filename={self.filename!r}, content_type={self.content_type!r}, size={self.size})"
+
+
+def _parse_part_headers(data):
+    headers = {}
+    for line in data.decode('utf-8', 'replace').split('\r\n'):
+        name, sep, value = line.partition(':')
+        if sep:
+            headers[name.strip().lower()] = value.strip()
+    return headers
+
+
+def parse_multipart(chunks, boundary, spool_size=DEFAULT_SPOOL_SIZE):
+    # Incremental multipart/form-data parser over an iterable of byte chunks.
+    # Only the unmatched tail of the current chunk is buffered; each completed
+    # Part is yielded as soon as its closing delimiter is seen.
+    if not boundary:
+        raise MultipartError("Missing multipart boundary")
+    delimiter = b'\r\n--' + boundary.encode('latin-1')
+    keep = len(delimiter) - 1
+    # The first delimiter has no leading CRLF; prepending one lets a single
+    # delimiter pattern match every boundary.
+    buffer = b'\r\n'
+    state = _PREAMBLE
+    part = None
+    for chunk in chunks:
+        buffer += chunk
+        while True:
+            if state == _PREAMBLE:
+                index = buffer.find(delimiter)
+                if index < 0:
+                    buffer = buffer[-keep:]
+                    break
+                buffer = buffer[index + len(delimiter):]
+                state = _DELIMITER
+            elif state == _DELIMITER:
+                if len(buffer) < 2:
+                    break
+                if buffer.startswith(b'--'):
+                    state = _END
+                    break
+                index = buffer.find(b'\r\n')
+                if index < 0:
+                    break
+                if buffer[:index].strip(b' \t'):
+                    raise MultipartError("Malformed multipart delimiter")
+                buffer = buffer[index + 2:]
+                state = _HEADERS
+            elif state == _HEADERS:
+                index = buffer.find(b'\r\n\r\n')
+                if index < 0:
+                    if len(buffer) > MAX_PART_HEADER_SIZE:
+                        raise MultipartError("Multipart part headers too large")
+                    break
+                part = Part(_parse_part_headers(buffer[:index]), spool_size)
+                buffer = buffer[index + 4:]
+                state = _BODY
+            elif state == _BODY:
+                index = buffer.find(delimiter)
+                if index < 0:
+                    if len(buffer) > keep:
+                        part.write(buffer[:-keep])
+                        buffer = buffer[-keep:]
+                    break
+                part.write(buffer[:index])
+                buffer = buffer[index + len(delimiter):]
+                state = _DELIMITER
+                part.finish()
+                yield part
+                part = None
+            else:
+                break
+        if state == _END:
+            break
+    if state != _END:
+        if part is not None:
+            part.close()
+        raise MultipartError("Truncated multipart body")
@@ -0,0 +1,72 @@
+import base64
+import json
+
+# Content type of a streamed function URL response: a JSON prelude with the
+# status, headers and cookies, eight NUL bytes, then the body as written.
+HTTP_INTEGRATION_CONTENT_TYPE = 'application/vnd.awslambda.http-integration-response'
+PRELUDE_DELIMITER = b'\x00' * 8
+
+
+def chunk_bytes(chunk):
+    if isinstance(chunk, str):
+        return chunk.encode('utf-8')
+    if isinstance(chunk, (bytes, bytearray, memoryview)):
+        return bytes(chunk)
+    raise ValueError(f"Stream chunks must be str or bytes, not {type(chunk).__name__}")
+
+
+def write_prelude(stream, prelude, json_codec):
+    stream.write(json_codec.dumps(prelude).encode('utf-8') + PRELUDE_DELIMITER)
+
+
+def write_result(stream, result, json_codec):
+    # A regular proxy result (cache hit, error, non-streaming handler) sent in one piece
+    body = result.get('body')
+    headers = result.get('headers')
+    if result.get('isBase64Encoded'):
+        data = base64.b64decode(body)
+    elif body is None or isinstance(body, str):
+        data = (body or '').encode('utf-8')
+    else:
+        # Function URL results may carry the body unserialized
+        data = json_codec.dumps(body).encode('utf-8')
+        if not headers or not any(name.lower() == 'content-type' for name in headers):
+            headers = {**(headers or {}), 'Content-Type': 'application/json'}
+    prelude = {'statusCode': result.get('statusCode', 200)}
+    if headers:
+        prelude['headers'] = headers
+    if result.get('cookies'):
+        prelude['cookies'] = result['cookies']
+    write_prelude(stream, prelude, json_codec)
+    if data:
+        stream.write(data)
+
+
+class LocalResponseStream:
+    # Offline stand-in for the Lambda streaming runtime: records every write so
+    # tests can check the prelude, the body and when each chunk went out.
+    content_type = HTTP_INTEGRATION_CONTENT_TYPE
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data):
+        if self.closed:
+            raise ValueError("Write to a closed response stream")
+        self.chunks.append(bytes(data))
+
+    def close(self):
+        self.closed = True
+
+    def getvalue(self):
+        return b''.join(self.chunks)
+
+    @property
+    def prelude(self):
+        head, delimiter, _ = self.getvalue().partition(PRELUDE_DELIMITER)
+        return json.loads(head) if delimiter else None
+
+    @property
+    def body(self):
+        return self.getvalue().partition(PRELUDE_DELIMITER)[2]
@@ -0,0 +1,247 @@
+import dataclasses
+import re
+import typing
+
+_MISSING = object()
+_NONE_TYPE = type(None)
+_TRUE_STRINGS = frozenset(('true', '1', 'yes', 'on'))
+_FALSE_STRINGS = frozenset(('false', '0', 'no', 'off'))
+# Plain decimal notation only: no '_' separators, surrounding spaces, nan or inf
+_FLOAT = re.compile(r'-?(?:[0-9]+(?:\.[0-9]*)?|\.[0-9]+)(?:[eE][+-]?[0-9]+)?')
+
+SWAGGER_TYPES = {
+    str: 'string',
+    int: 'integer',
+    float: 'number',
+    bool: 'boolean',
+    list: 'array',
+    tuple: 'array',
+    set: 'array',
+    dict: 'object',
+}
+
+
+class _NestedError(Exception):
+    def __init__(self, error):
+        self.error = error
+
+
+def _type_hints(obj):
+    try:
+        return typing.get_type_hints(obj)
+    except Exception:
+        return getattr(obj, '__annotations__', {})
+
+
+def _is_typed_dict(obj):
+    return isinstance(obj, type) and issubclass(obj, dict) and hasattr(obj, '__required_keys__')
+
+
+def request_schema(func):
+    # The req_params annotation of a handler, with string annotations resolved
+    annotations = getattr(func, '__annotations__', None) or {}
+    schema = annotations.get('req_params')
+    if isinstance(schema, str):
+        schema = _type_hints(func).get('req_params')
+    return schema
+
+
+def unwrap_optional(annotation):
+    # Optional[X] -> (X, True)
+    if typing.get_origin(annotation) is typing.Union:
+        args = [arg for arg in typing.get_args(annotation) if arg is not _NONE_TYPE]
+        if len(args) < len(typing.get_args(annotation)):
+            return (args[0] if len(args) == 1 else typing.Union[tuple(args)]), True
+    return annotation, False
+
+
+def schema_fields(schema):
+    # (name, type, required) for a dict of name -> type, a dataclass or a
+    # TypedDict; None for anything else.
+    if isinstance(schema, dict):
+        return [(name, annotation, True) for name, annotation in schema.items()]
+    if isinstance(schema, type) and dataclasses.is_dataclass(schema):
+        hints = _type_hints(schema)
+        return [(field.name, hints.get(field.name, field.type),
+                 field.default is dataclasses.MISSING and field.default_factory is dataclasses.MISSING)
+                for field in dataclasses.fields(schema)]
+    if _is_typed_dict(schema):
+        required = schema.__required_keys__
+        return [(name, annotation, name in required) for name, annotation in _type_hints(schema).items()]
+    return None
+
+
+def type_name(annotation):
+    return getattr(annotation, '__name__', None) or str(annotation).replace('typing.', '')
+
+
+def swagger_type(annotation):
+    annotation, _ = unwrap_optional(annotation)
+    if schema_fields(annotation) is not None:
+        return 'object'
+    return SWAGGER_TYPES.get(typing.get_origin(annotation) or annotation, 'string')
+
+
+# Shared with the int/float path converters so a value routing rejects is
+# rejected by validation as well
+def parse_int(value):
+    digits = value[1:] if value[:1] == '-' else value
+    if not (digits.isascii() and digits.isdigit()):
+        raise ValueError(f"Invalid integer: {value}")
+    return int(value)
+
+
+def parse_float(value):
+    if not _FLOAT.fullmatch(value):
+        raise ValueError(f"Invalid float: {value}")
+    return float(value)
+
+
+def _coerce_str(value):
+    if isinstance(value, str):
+        return value
+    raise TypeError
+
+
+def _coerce_int(value):
+    if type(value) is int:
+        return value
+    if isinstance(value, str):
+        return parse_int(value)
+    if type(value) is float and value.is_integer():
+        return int(value)
+    raise TypeError
+
+
+def _coerce_float(value):
+    if type(value) is float:
+        return value
+    if type(value) is int:
+        return float(value)
+    if isinstance(value, str):
+        return parse_float(value)
+    raise TypeError
+
+
+def _coerce_bool(value):
+    if type(value) is bool:
+        return value
+    if isinstance(value, str):
+        lowered = value.lower()
+        if lowered in _TRUE_STRINGS:
+            return True
+        if lowered in _FALSE_STRINGS:
+            return False
+    raise ValueError
+
+
+_SCALAR_COERCERS = {
+    str: _coerce_str,
+    int: _coerce_int,
+    float: _coerce_float,
+    bool: _coerce_bool,
+}
+
+
+def _compile_type(annotation, path, make_error):
+    # Returns coerce(value) -> value, raising TypeError/ValueError when the
+    # value does not fit, or None when anything is accepted.
+    if annotation is typing.Any or annotation is object:
+        return None
+    fields = schema_fields(annotation)
+    if fields is not None:
+        validate = _compile_object(fields, path + '.', make_error)
+
+        def coerce_object(value):
+            if not isinstance(value, dict):
+                raise TypeError
+            error = validate(value)
+            if error is not None:
+                raise _NestedError(error)
+            return value
+        return coerce_object
+    coerce = _SCALAR_COERCERS.get(annotation)
+    if coerce is not None:
+        return coerce
+    origin = typing.get_origin(annotation)
+    if origin in (list, tuple, set) or annotation in (list, tuple, set):
+        args = typing.get_args(annotation)
+        coerce_item = _compile_type(args[0], path, make_error) if args else None
+
+        def coerce_list(value):
+            if not isinstance(value, list):
+                raise TypeError
+            if coerce_item is None:
+                return value
+            return [coerce_item(item) for item in value]
+        return coerce_list
+    if origin is dict or annotation is dict:
+        def coerce_dict(value):
+            if not isinstance(value, dict):
+                raise TypeError
+            return value
+        return coerce_dict
+    if isinstance(annotation, type):
+        def coerce_type(value):
+            if isinstance(value, annotation):
+                return value
+            # Any class may be named here (Decimal raises InvalidOperation);
+            # whatever it raises on bad input is an invalid parameter, not a 500
+            try:
+                return annotation(value)
+            except Exception as e:
+                raise ValueError(str(e)) from e
+        return coerce_type
+    return None
+
+
+def _is_list_type(annotation):
+    return annotation in (list, tuple, set) or typing.get_origin(annotation) in (list, tuple, set)
+
+
+def _compile_object(fields, prefix, make_error, top_level=False):
+    checks = []
+    for name, annotation, required in fields:
+        annotation, optional = unwrap_optional(annotation)
+        path = prefix + name
+        checks.append((
+            name,
+            required and not optional,
+            _compile_type(annotation, path, make_error),
+            make_error(f"Missing parameter: {path}"),
+            make_error(f"Invalid parameter: {path} (expected {type_name(annotation)})"),
+            # Repeated query string parameters arrive as their first value
+            top_level and _is_list_type(annotation),
+        ))
+
+    def validate(params):
+        for name, required, coerce, missing, invalid, repeated in checks:
+            value = params.get(name, _MISSING)
+            if value is _MISSING or value is None:
+                if required:
+                    return missing
+                continue
+            if coerce is None:
+                continue
+            if repeated and not isinstance(value, list):
+                value = (params.getall(name) or [value]) if hasattr(params, 'getall') else [value]
+            try:
+                coerced = coerce(value)
+            except _NestedError as e:
+                return e.error
+            except (TypeError, ValueError):
+                return invalid
+            if coerced is not value:
+                params[name] = coerced
+        return None
+    return validate
+
+
+def compile_validator(schema, make_error=None):
+    # Compiles a req_params annotation into validate(params), which coerces
+    # values in place and returns None, or the error built by make_error for
+    # the first failing field. Errors are built once here, not per request.
+    fields = schema_fields(schema)
+    if fields is None:
+        return None
+    return _compile_object(fields, '', make_error or (lambda message: message), top_level=True)
@@ -0,0 +1,146 @@
+import os
+import sys
+import timeit
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from PyLambdAPI import LambdaFlask, Response  # noqa: E402
+from PyLambdAPI.lambda_flask import EVENT_ADAPTER, RawRequest  # noqa: E402
+
+# Snapshots taken inside the handlers while a traced request is running
+SNAPSHOTS = []
+
+
+def probe():
+    if tracemalloc.is_tracing():
+        SNAPSHOTS.append(tracemalloc.take_snapshot())
+
+
+def make_app():
+    app = LambdaFlask(source='api_gateway_proxy', enable_request_logging=False, enable_response_logging=False)
+
+    @app.route_decorator('/health', http_methods=['GET'])
+    def health(req_params):
+        probe()
+        return Response(200, {'status': 'ok'})
+
+    @app.route_decorator('/users/{id:int}', http_methods=['GET'])
+    def get_user(req_params):
+        probe()
+        return {'statusCode': 200, 'body': {'id': req_params['id'], 'page': req_params.get('page')}}
+
+    @app.route_decorator('/items', http_methods=['POST'])
+    def create_item(req_params):
+        probe()
+        return {'statusCode': 201, 'body': {'name': req_params['name']}}
+
+    app.freeze()
+    return app
+
+
+def make_event(method, path, query=None, body=None):
+    return {
+        'resource': path,
+        'path': path,
+        'httpMethod': method,
+        'headers': {'Content-Type': 'application/json', 'Accept': '*/*', 'User-Agent': 'bench'},
+        'queryStringParameters': query,
+        'requestContext': {'identity': {'sourceIp': '127.0.0.1'}},
+        'body': body,
+        'isBase64Encoded': False,
+    }
+
+
+EVENTS = {
+    'static GET': make_event('GET', '/health'),
+    'path param GET': make_event('GET', '/users/42', {'page': '2'}),
+    'JSON POST': make_event('POST', '/items', body='{"name": "widget", "price": 10}'),
+}
+
+
+def slot_values(obj):
+    names = [name for cls in type(obj).__mro__ for name in cls.__dict__.get('__slots__', ())]
+    return {name: getattr(obj, name) for name in names if hasattr(obj, name)}
+
+
+def dict_twin(cls):
+    # The same attributes kept in an instance __dict__, as before __slots__
+    base = dict if issubclass(cls, dict) else object
+    return type(cls.__name__, (base,), {})
+
+
+def instance_cost(cls, values, number=1000):
+    # Bytes and blocks per instance holding the same attribute references
+    instances = [None] * number
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for i in range(number):
+        instance = cls.__new__(cls)
+        for name, value in values.items():
+            setattr(instance, name, value)
+        instances[i] = instance
+    stats = tracemalloc.take_snapshot().compare_to(before, 'filename')
+    tracemalloc.stop()
+    return sum(stat.size_diff for stat in stats) / number, sum(stat.count_diff for stat in stats) / number
+
+
+def request_blocks(app, event, number):
+    # Blocks the framework allocated and still holds when the handler starts,
+    # i.e. the per-request objects built from the event
+    app.process_request(event)
+    filters = [tracemalloc.Filter(False, tracemalloc.__file__)]
+    tracemalloc.start()
+    total = 0
+    for _ in range(number):
+        SNAPSHOTS.clear()
+        before = tracemalloc.take_snapshot().filter_traces(filters)
+        app.process_request(event)
+        stats = SNAPSHOTS[0].filter_traces(filters).compare_to(before, 'filename')
+        total += sum(stat.count_diff for stat in stats)
+    tracemalloc.stop()
+    SNAPSHOTS.clear()
+    return total / number
+
+
+def peak_bytes(app, event, number):
+    # Peak memory allocated above the baseline while handling one request
+    app.process_request(event)
+    tracemalloc.start()
+    total = 0
+    for _ in range(number):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        app.process_request(event)
+        total += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+    return total / number
+
+
+def main():
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    app = make_app()
+    request = EVENT_ADAPTER.process_event(EVENTS['JSON POST'], 'api_gateway_proxy')
+    request.params()
+    objects = [request, request.params(), request.query, request.headers, RawRequest(EVENTS['JSON POST'], request),
+               Response(200, {'status': 'ok'})]
+    print('per-request objects, __slots__ vs the same attributes in a __dict__:')
+    print(f"  {'object':<16} {'attrs':>5} {'slots bytes':>11} {'dict bytes':>10} {'slots blocks':>12} {'dict blocks':>11}")
+    for obj in objects:
+        cls = type(obj)
+        values = slot_values(obj)
+        slots_size, slots_blocks = instance_cost(cls, values)
+        dict_size, dict_blocks = instance_cost(dict_twin(cls), values)
+        print(f"  {cls.__name__:<16} {len(values):>5} {slots_size:>11.0f} {dict_size:>10.0f} "
+              f"{slots_blocks:>12.1f} {dict_blocks:>11.1f}")
+    print()
+    print(f"{'request':<16} {'us/request':>10} {'peak bytes':>11} {'live blocks':>11}")
+    for name, event in EVENTS.items():
+        seconds = timeit.timeit(lambda: app.process_request(event), number=number) / number
+        traced = min(number, 2000)
+        print(f"{name:<16} {seconds * 1e6:>10.2f} {peak_bytes(app, event, traced):>11.0f} "
+              f"{request_blocks(app, event, min(traced, 200)):>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+import json
+import os
+import random
+import string
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from PyLambdAPI import LambdaFlask  # noqa: E402
+from PyLambdAPI.json_codec import available_json_codecs  # noqa: E402
+
+
+def make_payload(target_size):
+    rng = random.Random(42)
+    items = []
+    size = 0
+    while size < target_size:
+        item = {
+            'id': rng.randint(1, 10 ** 9),
+            'name': ''.join(rng.choices(string.ascii_letters, k=24)),
+            'price': round(rng.random() * 1000, 2),
+            'active': rng.random() > 0.5,
+            'tags': [''.join(rng.choices(string.ascii_lowercase, k=8)) for _ in range(4)],
+            'attributes': {'color': 'blue', 'weight': rng.random(), 'stock': rng.randint(0, 500)},
+        }
+        items.append(item)
+        size += len(json.dumps(item))
+    return {'items': items, 'count': len(items)}
+
+
+def api_gateway_event(body):
+    return {
+        'resource': '/items',
+        'path': '/items',
+        'httpMethod': 'POST',
+        'headers': {'Content-Type': 'application/json', 'Accept': '*/*'},
+        'queryStringParameters': {'page': '1'},
+        'requestContext': {'identity': {'sourceIp': '127.0.0.1'}},
+        'body': body,
+        'isBase64Encoded': False,
+    }
+
+
+def function_url_event(body):
+    return {
+        'version': '2.0',
+        'rawPath': '/items',
+        'headers': {'content-type': 'application/json'},
+        'queryStringParameters': {'page': '1'},
+        'requestContext': {'http': {'method': 'POST', 'path': '/items'}},
+        'body': body,
+        'isBase64Encoded': False,
+    }
+
+
+def make_app(codec, source):
+    app = LambdaFlask(source=source, enable_request_logging=False,
+                      enable_response_logging=False, json_codec=codec)
+
+    @app.route_decorator('/items', http_methods=['POST'])
+    def echo(req_params):
+        return {'statusCode': 200, 'body': {'items': req_params['items'], 'count': req_params['count']}}
+
+    return app
+
+
+def main():
+    sizes = [int(arg) * 1024 for arg in sys.argv[1:]] or [200 * 1024, 500 * 1024]
+    codecs = available_json_codecs()
+    print(f"{'payload':>8} {'source':>18} {'codec':>8} {'decode ms':>10} {'encode ms':>10} {'request ms':>11}")
+    for size in sizes:
+        payload = make_payload(size)
+        body = json.dumps(payload)
+        for source, make_event in (('api_gateway_proxy', api_gateway_event), ('function_url', function_url_event)):
+            event = make_event(body)
+            for codec in codecs:
+                app = make_app(codec, source)
+                number = 20
+                decode = timeit.timeit(lambda: codec.loads(body), number=number) / number
+                encode = timeit.timeit(lambda: codec.dumps(payload), number=number) / number
+                request = timeit.timeit(lambda: app.process_request(event), number=number) / number
+                print(f"{len(body) // 1024:>6}KB {source:>18} {codec.name:>8} "
+                      f"{decode * 1000:>10.2f} {encode * 1000:>10.2f} {request * 1000:>11.2f}")
+
+
+if __name__ == '__main__':
+    main()
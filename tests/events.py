@@ -0,0 +1,76 @@
+import base64
+import json
+from urllib.parse import urlencode
+
+
+def _body(body, is_base64_encoded):
+    if body is not None and not isinstance(body, (str, bytes)):
+        body = json.dumps(body)
+    if is_base64_encoded and body is not None:
+        body = base64.b64encode(body if isinstance(body, bytes) else body.encode('utf-8')).decode('ascii')
+    return body
+
+
+def function_url_event(path='/', method='GET', query=None, headers=None, body=None, is_base64_encoded=False,
+                       cookies=None, raw_query_string=None):
+    event = {
+        'version': '2.0',
+        'rawPath': path,
+        'rawQueryString': raw_query_string if raw_query_string is not None else urlencode(query or {}),
+        'headers': headers or {},
+        'requestContext': {'http': {'method': method, 'path': path}},
+        'isBase64Encoded': is_base64_encoded,
+    }
+    if query:
+        event['queryStringParameters'] = query
+    if body is not None:
+        event['body'] = _body(body, is_base64_encoded)
+    if cookies:
+        event['cookies'] = cookies
+    return event
+
+
+http_api_event = function_url_event
+
+
+def rest_event(path='/', method='GET', query=None, headers=None, body=None, is_base64_encoded=False,
+               multi_value_query=None, multi_value_headers=None):
+    return {
+        'resource': path,
+        'path': path,
+        'httpMethod': method,
+        'queryStringParameters': query,
+        'multiValueQueryStringParameters': multi_value_query or (
+            {name: [value] for name, value in query.items()} if query else None),
+        'headers': headers,
+        'multiValueHeaders': multi_value_headers or (
+            {name: [value] for name, value in headers.items()} if headers else None),
+        'body': _body(body, is_base64_encoded),
+        'isBase64Encoded': is_base64_encoded,
+        'requestContext': {'identity': {'sourceIp': '127.0.0.1'}},
+    }
+
+
+def alb_event(path='/', method='GET', query=None, headers=None, body=None, is_base64_encoded=False,
+              multi_value=False):
+    event = {
+        'requestContext': {'elb': {'targetGroupArn': 'arn:aws:elasticloadbalancing:target'}},
+        'httpMethod': method,
+        'path': path,
+        'body': _body(body, is_base64_encoded) or '',
+        'isBase64Encoded': is_base64_encoded,
+    }
+    if multi_value:
+        event['multiValueQueryStringParameters'] = query or {}
+        event['multiValueHeaders'] = headers or {}
+    else:
+        event['queryStringParameters'] = query or {}
+        event['headers'] = headers or {}
+    return event
+
+
+def quiet_app(**options):
+    from PyLambdAPI import LambdaFlask
+    options.setdefault('enable_request_logging', False)
+    options.setdefault('enable_response_logging', False)
+    return LambdaFlask(**options)
@@ -0,0 +1,75 @@
+import asyncio
+import unittest
+
+from PyLambdAPI import Middleware, Response
+from PyLambdAPI.lambda_flask import get_event_loop
+
+from events import function_url_event, quiet_app
+
+
+class AsyncTag(Middleware):
+    async def process_request(self, req_params):
+        await asyncio.sleep(0)
+        if 'deny' in req_params:
+            return Response(403, 'denied')
+        return req_params
+
+    async def process_response(self, response):
+        await asyncio.sleep(0)
+        response.headers = {**(response.headers or {}), 'X-Async': '1'}
+        return response
+
+
+class TestAsyncHandlers(unittest.TestCase):
+    def setUp(self):
+        self.app = quiet_app()
+        self.loops = []
+
+        @self.app.route_decorator('/sleep', http_methods=['GET'])
+        async def sleep(req_params):
+            self.loops.append(asyncio.get_running_loop())
+            results = await asyncio.gather(asyncio.sleep(0, 'a'), asyncio.sleep(0, 'b'))
+            return {'results': results}
+
+    def test_async_handler_is_awaited(self):
+        result = self.app.process_request(function_url_event('/sleep'))
+        self.assertEqual(result, {'statusCode': 200, 'body': {'results': ['a', 'b']}})
+
+    def test_loop_persists_across_invocations(self):
+        self.app.process_request(function_url_event('/sleep'))
+        self.app.process_request(function_url_event('/sleep'))
+        self.assertIs(self.loops[0], self.loops[1])
+        self.assertIs(self.loops[0], get_event_loop())
+        self.assertFalse(self.loops[0].is_closed())
+
+    def test_async_middleware_around_sync_and_async_handlers(self):
+        app = quiet_app(middlewares=[AsyncTag()])
+
+        @app.route_decorator('/sync', http_methods=['GET'])
+        def sync(req_params):
+            return 'sync'
+
+        @app.route_decorator('/async', http_methods=['GET'])
+        async def handler(req_params):
+            return 'async'
+
+        for path in ('/sync', '/async'):
+            with self.subTest(path):
+                result = app.process_request(function_url_event(path))
+                self.assertEqual(result['body'], path[1:])
+                self.assertEqual(result['headers']['X-Async'], '1')
+                denied = app.process_request(function_url_event(path, query={'deny': '1'}))
+                self.assertEqual(denied['statusCode'], 403)
+
+    def test_exceptions_in_async_handlers_are_500s(self):
+        @self.app.route_decorator('/boom', http_methods=['GET'])
+        async def boom(req_params):
+            raise RuntimeError('boom')
+
+        with self.assertLogs('PyLambdAPI.lambda_flask', 'ERROR'):
+            result = self.app.process_request(function_url_event('/boom'))
+        self.assertEqual(result['statusCode'], 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+import threading
+import unittest
+
+from PyLambdAPI import BatchProcessor
+from PyLambdAPI.batch import DYNAMODB, KINESIS, SQS
+
+QUEUE = 'arn:aws:sqs:eu-west-1:123456789012:orders'
+FIFO_QUEUE = 'arn:aws:sqs:eu-west-1:123456789012:orders.fifo'
+STREAM = 'arn:aws:kinesis:eu-west-1:123456789012:stream/clicks'
+TABLE = 'arn:aws:dynamodb:eu-west-1:123456789012:table/users/stream/2024-01-01T00:00:00.000'
+
+
+def sqs_record(message_id, body='', arn=QUEUE, group=None):
+    record = {'eventSource': SQS, 'eventSourceARN': arn, 'messageId': message_id, 'body': body, 'attributes': {}}
+    if group is not None:
+        record['attributes']['MessageGroupId'] = group
+    return record
+
+
+def kinesis_record(sequence_number, partition_key, data=''):
+    return {'eventSource': KINESIS, 'eventSourceARN': STREAM,
+            'kinesis': {'sequenceNumber': sequence_number, 'partitionKey': partition_key, 'data': data}}
+
+
+def dynamodb_record(sequence_number, key):
+    return {'eventSource': DYNAMODB, 'eventSourceARN': TABLE,
+            'dynamodb': {'SequenceNumber': sequence_number, 'Keys': {'id': {'S': key}}}}
+
+
+def failures(result):
+    return [failure['itemIdentifier'] for failure in result['batchItemFailures']]
+
+
+class TestBatchProcessor(unittest.TestCase):
+    def setUp(self):
+        self.processor = BatchProcessor(enable_logging=False)
+        self.handled = []
+        self.lock = threading.Lock()
+
+    def handler(self, get_id, fail=()):
+        def handle(record):
+            record_id = get_id(record)
+            with self.lock:
+                self.handled.append(record_id)
+            if record_id in fail:
+                raise RuntimeError(f'failed {record_id}')
+        return handle
+
+    def test_only_failed_sqs_messages_are_reported(self):
+        self.processor.register(SQS, self.handler(lambda record: record['messageId'], fail={'2', '4'}))
+        result = self.processor.process({'Records': [sqs_record(str(i)) for i in range(1, 6)]})
+        self.assertEqual(failures(result), ['2', '4'])
+        self.assertEqual(sorted(self.handled), ['1', '2', '3', '4', '5'])
+
+    def test_fifo_group_stops_at_the_first_failure(self):
+        self.processor.register(SQS, self.handler(lambda record: record['messageId'], fail={'a2'}))
+        records = [sqs_record('a1', arn=FIFO_QUEUE, group='a'), sqs_record('b1', arn=FIFO_QUEUE, group='b'),
+                   sqs_record('a2', arn=FIFO_QUEUE, group='a'), sqs_record('a3', arn=FIFO_QUEUE, group='a'),
+                   sqs_record('b2', arn=FIFO_QUEUE, group='b')]
+        result = self.processor.process({'Records': records})
+        self.assertEqual(failures(result), ['a2', 'a3'])
+        self.assertNotIn('a3', self.handled)
+        self.assertIn('b2', self.handled)
+
+    def test_kinesis_partition_keeps_order_and_reports_sequence_numbers(self):
+        self.processor.register(KINESIS, self.handler(lambda record: record['kinesis']['sequenceNumber'],
+                                                      fail={'2'}))
+        records = [kinesis_record('1', 'p'), kinesis_record('2', 'p'), kinesis_record('3', 'p'),
+                   kinesis_record('4', 'q')]
+        result = self.processor.process({'Records': records})
+        self.assertEqual(failures(result), ['2', '3'])
+        self.assertEqual(sorted(self.handled), ['1', '2', '4'])
+
+    def test_dynamodb_records_are_ordered_per_key(self):
+        self.processor.register(DYNAMODB, self.handler(lambda record: record['dynamodb']['SequenceNumber'],
+                                                       fail={'10'}))
+        records = [dynamodb_record('10', 'u1'), dynamodb_record('11', 'u1'), dynamodb_record('12', 'u2')]
+        self.assertEqual(failures(self.processor.process({'Records': records})), ['10', '11'])
+
+    def test_records_without_a_handler_fail(self):
+        with self.assertLogs('PyLambdAPI.batch', 'ERROR'):
+            result = BatchProcessor().process({'Records': [sqs_record('1')]})
+        self.assertEqual(failures(result), ['1'])
+
+    def test_handlers_per_source_name(self):
+        seen = []
+        self.processor.register(SQS, lambda record: seen.append(('orders', record['messageId'])), 'orders')
+        self.processor.register(SQS, lambda record: seen.append(('default', record['messageId'])))
+        other = 'arn:aws:sqs:eu-west-1:123456789012:refunds'
+        result = self.processor.process({'Records': [sqs_record('1'), sqs_record('2', arn=other)]})
+        self.assertEqual(failures(result), [])
+        self.assertEqual(sorted(seen), [('default', '2'), ('orders', '1')])
+
+    def test_async_handlers(self):
+        @self.processor.record_decorator(SQS)
+        async def handle(record):
+            if record['body'] == 'bad':
+                raise ValueError('bad body')
+
+        result = self.processor.process({'Records': [sqs_record('1'), sqs_record('2', 'bad'), sqs_record('3')]})
+        self.assertEqual(failures(result), ['2'])
+
+    def test_empty_batch(self):
+        self.assertEqual(self.processor.process({'Records': []}), {'batchItemFailures': []})
+
+    def test_unknown_sources_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self.processor.register('aws:s3', print)
+        with self.assertRaises(ValueError):
+            self.processor.process({'Records': [{'eventSource': 'aws:s3'}]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import base64
+import unittest
+
+from events import function_url_event, quiet_app
+
+
+class TestBodyParsers(unittest.TestCase):
+    def setUp(self):
+        self.app = quiet_app()
+
+        @self.app.route_decorator('/echo', http_methods=['POST'])
+        def echo(req_params):
+            params = dict(req_params)
+            del params['headers']
+            return params
+
+    def post(self, body, content_type=None, is_base64_encoded=False):
+        headers = {'content-type': content_type} if content_type else {}
+        return self.app.process_request(function_url_event('/echo', method='POST', body=body, headers=headers,
+                                                           is_base64_encoded=is_base64_encoded))['body']
+
+    def test_urlencoded_form(self):
+        body = self.post('name=J%C3%BCrgen+S&tag=a&tag=b&empty=', 'application/x-www-form-urlencoded')
+        self.assertEqual(body, {'name': 'Jürgen S', 'tag': 'a', 'empty': ''})
+
+    def test_urlencoded_form_repeated_values(self):
+        @self.app.route_decorator('/tags', http_methods=['POST'])
+        def tags(req_params):
+            return req_params.request.form.getall('tag')
+
+        result = self.app.process_request(function_url_event(
+            '/tags', method='POST', body='tag=a&tag=b', is_base64_encoded=True,
+            headers={'content-type': 'application/x-www-form-urlencoded; charset=utf-8'}))
+        self.assertEqual(result['body'], ['a', 'b'])
+
+    def test_json_and_json_suffix(self):
+        self.assertEqual(self.post('{"a": 1}', 'application/json'), {'a': 1})
+        self.assertEqual(self.post('{"a": 1}', 'application/problem+json'), {'a': 1})
+        self.assertEqual(self.post('[1, 2]', 'application/json'), {'body': [1, 2]})
+        # Bodies without a Content-Type are still read as JSON
+        self.assertEqual(self.post('{"a": 1}'), {'a': 1})
+
+    def test_text(self):
+        self.assertEqual(self.post('caf\xe9'.encode('latin-1'), 'text/plain; charset=latin-1',
+                                   is_base64_encoded=True), {'body': 'café'})
+
+    def test_binary(self):
+        self.assertEqual(self.post(b'\x00\x01', 'application/octet-stream', is_base64_encoded=True),
+                         {'base64': True, 'file': b'\x00\x01'})
+        self.assertEqual(self.post(b'\x00\x01', is_base64_encoded=True), {'base64': True, 'file': b'\x00\x01'})
+
+    def test_register_body_parser(self):
+        self.app.register_body_parser('application/xml', lambda request: {'xml': request.text})
+        self.app.register_body_parser('image/*', lambda request: {'image': len(request.body)})
+        self.assertEqual(self.post('<a/>', 'Application/XML'), {'xml': '<a/>'})
+        self.assertEqual(self.post(base64.b64decode('iVBORw0K'), 'image/png', is_base64_encoded=True), {'image': 6})
+
+
+if __name__ == '__main__':
+    unittest.main()
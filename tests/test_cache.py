@@ -0,0 +1,313 @@
+import threading
+import unittest
+
+from PyLambdAPI import Middleware, Response
+from PyLambdAPI.cache import CachePolicy, ResponseCache, as_cache_policy
+
+from events import function_url_event, quiet_app
+
+
+class RequireToken(Middleware):
+    def process_request(self, req_params):
+        if req_params['headers'].get('authorization') != 'Bearer good':
+            return Response(401, {'error': 'Unauthorized'})
+        return req_params
+
+
+class AddHeader(Middleware):
+    def __init__(self, name, calls):
+        super().__init__()
+        self.name = name
+        self.calls = calls
+
+    def process_response(self, response):
+        self.calls.append(self.name)
+        response.headers = {**(response.headers or {}), self.name: '1'}
+        return response
+
+
+class AsyncRequireToken(RequireToken):
+    async def process_request(self, req_params):
+        return RequireToken.process_request(self, req_params)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestResponseCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ResponseCache(max_entries=2, clock=self.clock)
+
+    def test_entries_expire_after_their_ttl(self):
+        self.cache.set('a', {'body': 'a'}, ttl=10)
+        self.clock.now += 9.9
+        self.assertEqual(self.cache.get('a'), {'body': 'a'})
+        self.clock.now += 0.1
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(len(self.cache), 0)
+        self.assertEqual(self.cache.stats()['expirations'], 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.set('a', {'body': 'a'}, ttl=10)
+        self.cache.set('b', {'body': 'b'}, ttl=10)
+        self.cache.get('a')
+        self.cache.set('c', {'body': 'c'}, ttl=10)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertIsNotNone(self.cache.get('a'))
+        self.assertEqual(self.cache.stats()['evictions'], 1)
+
+    def test_entries_are_copied_in_and_out(self):
+        result = {'body': 'a'}
+        self.cache.set('a', result, ttl=10)
+        result['body'] = 'changed'
+        self.cache.get('a')['body'] = 'changed'
+        self.assertEqual(self.cache.get('a'), {'body': 'a'})
+
+    def test_cache_policies(self):
+        self.assertEqual(as_cache_policy(30).ttl, 30)
+        policy = as_cache_policy({'ttl': 5, 'query_params': ['page']})
+        self.assertEqual(policy.query_params, ('page',))
+        self.assertIs(as_cache_policy(policy), policy)
+        for invalid in (True, 'soon', 0, {'ttl': 5, 'stale_while_revalidate': -1}):
+            with self.subTest(invalid=invalid), self.assertRaises(ValueError):
+                as_cache_policy(invalid)
+
+
+class TestCachedRoutes(unittest.TestCase):
+    def make_app(self, cache, http_methods=('GET',)):
+        app = quiet_app()
+        self.clock = app.response_cache.clock = FakeClock()
+        self.calls = []
+
+        @app.route_decorator('/items', http_methods=list(http_methods), cache=cache)
+        def items(req_params):
+            self.calls.append(req_params.get('page'))
+            return {'call': len(self.calls)}
+        return app
+
+    def get(self, app, **kwargs):
+        return app.process_request(function_url_event('/items', **kwargs))['body']
+
+    def test_warm_invocations_hit_until_the_ttl(self):
+        app = self.make_app(60)
+        self.assertEqual(self.get(app), {'call': 1})
+        self.assertEqual(self.get(app), {'call': 1})
+        self.clock.now += 60
+        self.assertEqual(self.get(app), {'call': 2})
+
+    def test_key_varies_on_query_and_listed_headers(self):
+        app = self.make_app(CachePolicy(60, query_params=['page'], headers=['Accept-Language']))
+        self.get(app, query={'page': '1', 'utm': 'a'})
+        self.get(app, query={'page': '1', 'utm': 'b'})
+        self.get(app, query={'page': '2'})
+        self.get(app, query={'page': '2'}, headers={'accept-language': 'fr'})
+        self.assertEqual(self.calls, ['1', '2', '2'])
+
+    def test_repeated_listed_query_params_are_all_part_of_the_key(self):
+        app = quiet_app()
+        calls = []
+
+        @app.route_decorator('/items', http_methods=['GET'], cache={'ttl': 60, 'query_params': ['id']})
+        def items(req_params):
+            calls.append(1)
+            return {'ids': req_params.getall('id')}
+
+        first = app.process_request(function_url_event('/items', query={'id': '1,2'}, raw_query_string='id=1&id=2'))
+        second = app.process_request(function_url_event('/items', query={'id': '1,3'}, raw_query_string='id=1&id=3'))
+        self.assertEqual(first['body'], {'ids': ['1', '2']})
+        self.assertEqual(second['body'], {'ids': ['1', '3']})
+        self.assertEqual(len(calls), 2)
+
+    def test_only_get_and_head_are_cached(self):
+        app = self.make_app(60, http_methods=('GET', 'POST'))
+        app.process_request(function_url_event('/items', method='POST'))
+        app.process_request(function_url_event('/items', method='POST'))
+        self.assertEqual(len(self.calls), 2)
+
+    def test_errors_are_not_cached(self):
+        app = quiet_app()
+        calls = []
+
+        @app.route_decorator('/flaky', http_methods=['GET'], cache=60)
+        def flaky(req_params):
+            calls.append(1)
+            return Response(503, 'try again')
+
+        app.process_request(function_url_event('/flaky'))
+        app.process_request(function_url_event('/flaky'))
+        self.assertEqual(len(calls), 2)
+
+
+class LambdaContext:
+    def __init__(self, remaining_ms):
+        self.remaining_ms = remaining_ms
+
+    def get_remaining_time_in_millis(self):
+        return self.remaining_ms
+
+
+class TestStaleWhileRevalidate(unittest.TestCase):
+    def setUp(self):
+        self.app = quiet_app()
+        self.clock = self.app.response_cache.clock = FakeClock()
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+        self.slow_by = 0
+        self.fail = False
+
+        @self.app.route_decorator('/slow', http_methods=['GET'], cache={'ttl': 10, 'stale_while_revalidate': 60})
+        def slow(req_params):
+            self.calls.append(1)
+            self.release.wait(5)
+            self.clock.now += self.slow_by
+            if self.fail:
+                raise RuntimeError('upstream down')
+            return {'version': len(self.calls)}
+
+    def get(self, context=None):
+        return self.app.process_request(function_url_event('/slow'), context)['body']
+
+    def wait_for_refreshes(self):
+        self.release.set()
+        self.app.refresh_executor.shutdown(wait=True)
+        self.app.refresh_executor = None
+
+    def test_stale_entry_is_served_while_refreshed_once(self):
+        self.assertEqual(self.get(), {'version': 1})
+        self.clock.now += 15
+        self.release.clear()
+        # Both requests get the stale body; only one refresh runs
+        self.assertEqual(self.get(), {'version': 1})
+        self.assertEqual(self.get(), {'version': 1})
+        self.wait_for_refreshes()
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(self.get(), {'version': 2})
+        stats = self.app.response_cache.stats()
+        self.assertEqual((stats['stale_hits'], stats['refreshes']), (2, 1))
+
+    def test_entries_past_the_stale_window_are_recomputed_inline(self):
+        self.get()
+        self.clock.now += 70
+        self.assertEqual(self.get(), {'version': 2})
+        self.assertIsNone(self.app.refresh_executor)
+
+    def test_no_refresh_without_time_left_in_the_invocation(self):
+        self.get()
+        self.clock.now += 15
+        self.assertEqual(self.get(LambdaContext(remaining_ms=200)), {'version': 1})
+        self.assertIsNone(self.app.refresh_executor)
+        self.assertEqual(len(self.calls), 1)
+
+    def test_refresh_finishing_past_the_deadline_is_dropped(self):
+        self.get()
+        self.clock.now += 15
+        self.slow_by = 5
+        self.assertEqual(self.get(LambdaContext(remaining_ms=2000)), {'version': 1})
+        self.wait_for_refreshes()
+        self.assertEqual(len(self.calls), 2)
+        # Still the stale entry: the late result was not stored
+        self.assertEqual(self.get(LambdaContext(remaining_ms=0)), {'version': 1})
+
+    def test_failed_refresh_is_logged_and_keeps_the_stale_entry(self):
+        self.get()
+        self.clock.now += 15
+        self.fail = True
+        with self.assertLogs('PyLambdAPI.lambda_flask', 'ERROR'):
+            self.assertEqual(self.get(), {'version': 1})
+            self.wait_for_refreshes()
+        self.assertEqual(self.app.response_cache.refreshing, set())
+
+
+class TestCacheWithMiddleware(unittest.TestCase):
+    def make_app(self, auth, is_async=False):
+        app = quiet_app()
+        self.calls = []
+        self.hooks = []
+        app.use_middleware(AddHeader('X-Outer', self.hooks))
+
+        if is_async:
+            @app.route_decorator('/private', http_methods=['GET'], middlewares=[auth], cache=60)
+            async def private(req_params):
+                self.calls.append(1)
+                return {'secret': 42}
+        else:
+            @app.route_decorator('/private', http_methods=['GET'], middlewares=[auth], cache=60)
+            def private(req_params):
+                self.calls.append(1)
+                return {'secret': 42}
+        return app
+
+    def check_auth_wins_over_cache(self, app):
+        authorized = function_url_event('/private', headers={'authorization': 'Bearer good'})
+        first = app.process_request(authorized)
+        self.assertEqual(first['statusCode'], 200)
+
+        anonymous = app.process_request(function_url_event('/private'))
+        self.assertEqual(anonymous['statusCode'], 401)
+        self.assertNotIn('secret', str(anonymous['body']))
+        # The short-circuit still passes the app-wide layer outside the route middleware
+        self.assertEqual(anonymous['headers']['X-Outer'], '1')
+
+        second = app.process_request(authorized)
+        self.assertEqual(second, first)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(app.response_cache.stats()['hits'], 1)
+
+    def test_401_short_circuit_wins_over_cached_entry(self):
+        self.check_auth_wins_over_cache(self.make_app(RequireToken()))
+
+    def test_401_short_circuit_wins_over_cached_entry_async(self):
+        self.check_auth_wins_over_cache(self.make_app(AsyncRequireToken(), is_async=True))
+
+    def test_response_hooks_run_once_per_filled_entry(self):
+        app = self.make_app(RequireToken())
+        authorized = function_url_event('/private', headers={'authorization': 'Bearer good'})
+        app.process_request(authorized)
+        app.process_request(authorized)
+        self.assertEqual(self.hooks, ['X-Outer'])
+
+
+class TestUnsharedResponsesAreNotCached(unittest.TestCase):
+    def make_app(self, response):
+        app = quiet_app()
+        self.calls = []
+
+        @app.route_decorator('/me', http_methods=['GET'], cache=60)
+        def me(req_params):
+            self.calls.append(1)
+            return response()
+        return app
+
+    def assert_not_shared(self, response):
+        app = self.make_app(response)
+        app.process_request(function_url_event('/me'))
+        app.process_request(function_url_event('/me'))
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(len(app.response_cache), 0)
+
+    def test_cookies_are_not_cached(self):
+        self.assert_not_shared(lambda: Response(200, {'user': 1}, cookies=['session=user1']))
+
+    def test_set_cookie_header_is_not_cached(self):
+        self.assert_not_shared(lambda: Response(200, {'user': 1}, multiValueHeaders={'Set-Cookie': ['a=1']}))
+
+    def test_cache_control_private_and_no_store_are_not_cached(self):
+        self.assert_not_shared(lambda: Response(200, 'x', {'Cache-Control': 'private, max-age=60'}))
+        self.assert_not_shared(lambda: Response(200, 'x', {'cache-control': 'no-store'}))
+
+    def test_public_responses_are_cached(self):
+        app = self.make_app(lambda: Response(200, 'x', {'Cache-Control': 'public, max-age=60'}))
+        app.process_request(function_url_event('/me'))
+        app.process_request(function_url_event('/me'))
+        self.assertEqual(len(self.calls), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+import base64
+import gzip
+import json
+import unittest
+import zlib
+
+from PyLambdAPI import Response
+from PyLambdAPI.compression import (DecompressionLimitExceeded, compress, decompress, is_compressible,
+                                    negotiate_encoding)
+
+from events import alb_event, function_url_event, quiet_app, rest_event
+
+LARGE = {'items': ['value %d' % i for i in range(500)]}
+
+
+class TestNegotiation(unittest.TestCase):
+    def test_server_preference_among_accepted_encodings(self):
+        self.assertEqual(negotiate_encoding('deflate, gzip'), 'gzip')
+        self.assertEqual(negotiate_encoding('deflate'), 'deflate')
+        self.assertEqual(negotiate_encoding('gzip;q=0, deflate;q=0.5'), 'deflate')
+        self.assertEqual(negotiate_encoding('*'), negotiate_encoding('gzip, deflate'))
+
+    def test_nothing_acceptable(self):
+        for header in (None, '', 'identity', 'gzip;q=0', 'compress', '*;q=0'):
+            with self.subTest(header=header):
+                self.assertIsNone(negotiate_encoding(header))
+
+    def test_compressible_types(self):
+        for content_type in (None, 'text/html; charset=utf-8', 'application/json', 'application/problem+json'):
+            self.assertTrue(is_compressible(content_type), content_type)
+        for content_type in ('image/png', 'application/zip', 'application/octet-stream'):
+            self.assertFalse(is_compressible(content_type), content_type)
+
+
+class TestResponseCompression(unittest.TestCase):
+    def make_app(self, result, **options):
+        app = quiet_app(source='api_gateway_proxy', **options)
+
+        @app.route_decorator('/', http_methods=['GET'])
+        def handler(req_params):
+            return result()
+        return app
+
+    def get(self, app, accept_encoding='gzip'):
+        return app.process_request(rest_event('/', headers={'Accept-Encoding': accept_encoding}))
+
+    def test_large_json_is_gzipped(self):
+        result = self.get(self.make_app(lambda: LARGE, compression=True))
+        self.assertTrue(result['isBase64Encoded'])
+        self.assertEqual(result['headers']['Content-Encoding'], 'gzip')
+        self.assertEqual(result['headers']['Vary'], 'Accept-Encoding')
+        self.assertEqual(json.loads(gzip.decompress(base64.b64decode(result['body']))), LARGE)
+
+    def test_deflate(self):
+        result = self.get(self.make_app(lambda: LARGE, compression=True), 'deflate')
+        self.assertEqual(result['headers']['Content-Encoding'], 'deflate')
+        self.assertEqual(json.loads(zlib.decompress(base64.b64decode(result['body']))), LARGE)
+
+    def test_existing_vary_is_kept(self):
+        app = self.make_app(lambda: Response(200, LARGE, {'Vary': 'Origin'}), compression=True)
+        self.assertEqual(self.get(app)['headers']['Vary'], 'Origin, Accept-Encoding')
+
+    def test_lowercase_vary_is_updated_in_place(self):
+        app = self.make_app(lambda: Response(200, LARGE, {'vary': 'Origin'}), compression=True)
+        headers = self.get(app)['headers']
+        self.assertEqual(headers['vary'], 'Origin, Accept-Encoding')
+        self.assertNotIn('Vary', headers)
+
+        app = quiet_app(source='alb', compression=True)
+
+        @app.route_decorator('/', http_methods=['GET'])
+        def handler(req_params):
+            return Response(200, LARGE, multiValueHeaders={'vary': ['Origin']})
+
+        result = app.process_request(alb_event('/', headers={'accept-encoding': ['gzip']}, multi_value=True))
+        self.assertEqual(result['multiValueHeaders']['vary'], ['Origin, Accept-Encoding'])
+        self.assertNotIn('Vary', result['multiValueHeaders'])
+
+    def test_uncompressed_cases(self):
+        cases = (
+            ('disabled', self.make_app(lambda: LARGE), 'gzip'),
+            ('not accepted', self.make_app(lambda: LARGE, compression=True), 'identity'),
+            ('below threshold', self.make_app(lambda: {'a': 1}, compression=True), 'gzip'),
+            ('binary type', self.make_app(lambda: Response(200, 'x' * 4096, {'Content-Type': 'image/png'}),
+                                          compression=True), 'gzip'),
+            ('already encoded', self.make_app(lambda: Response(200, 'x' * 4096, {'Content-Encoding': 'br'}),
+                                              compression=True), 'gzip'),
+        )
+        for name, app, accept_encoding in cases:
+            with self.subTest(name):
+                result = self.get(app, accept_encoding)
+                self.assertFalse(result.get('isBase64Encoded'))
+                self.assertNotEqual((result.get('headers') or {}).get('Content-Encoding'), 'gzip')
+
+    def test_per_route_level_overrides_the_app_setting(self):
+        app = quiet_app(source='api_gateway_proxy')
+
+        @app.route_decorator('/', http_methods=['GET'], compression_level=9)
+        def handler(req_params):
+            return LARGE
+
+        self.assertEqual(self.get(app)['headers']['Content-Encoding'], 'gzip')
+
+    def test_function_url_json_body_is_serialized_before_compression(self):
+        app = quiet_app(compression=True)
+
+        @app.route_decorator('/', http_methods=['GET'])
+        def handler(req_params):
+            return LARGE
+
+        result = app.process_request(function_url_event('/', headers={'accept-encoding': 'gzip'}))
+        self.assertEqual(result['headers']['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(gzip.decompress(base64.b64decode(result['body']))), LARGE)
+
+    def test_compress_rejects_unknown_encodings(self):
+        with self.assertRaises(ValueError):
+            compress(b'data', 'zstd')
+
+
+class TestDecompression(unittest.TestCase):
+    data = json.dumps(LARGE).encode('utf-8')
+
+    def test_round_trips(self):
+        raw = zlib.compressobj(6, zlib.DEFLATED, -15)
+        cases = {
+            'gzip': gzip.compress(self.data),
+            'x-gzip': gzip.compress(self.data),
+            'deflate': zlib.compress(self.data),
+        }
+        for encoding, payload in cases.items():
+            with self.subTest(encoding):
+                self.assertEqual(decompress(payload, encoding), self.data)
+        # Raw deflate streams without the zlib header are accepted too
+        self.assertEqual(decompress(raw.compress(self.data) + raw.flush(), 'deflate'), self.data)
+
+    def test_limit_stops_a_bomb(self):
+        bomb = gzip.compress(b'\0' * (20 * 1024 * 1024))
+        with self.assertRaises(DecompressionLimitExceeded):
+            decompress(bomb, 'gzip', max_size=1024 * 1024)
+        self.assertEqual(len(decompress(gzip.compress(b'\0' * 1024), 'gzip', max_size=1024)), 1024)
+
+    def test_malformed_input(self):
+        with self.assertRaises(ValueError):
+            decompress(gzip.compress(self.data)[:-20], 'gzip')
+        with self.assertRaises(ValueError):
+            decompress(b'not compressed', 'br')
+
+
+class TestRequestDecompression(unittest.TestCase):
+    def make_app(self, **options):
+        app = quiet_app(**options)
+
+        @app.route_decorator('/items', http_methods=['POST'])
+        def create(req_params):
+            return {'count': len(req_params['items'])}
+        return app
+
+    def post(self, app, body, encoding):
+        return app.process_request(function_url_event(
+            '/items', method='POST', body=body, is_base64_encoded=True,
+            headers={'content-type': 'application/json', 'content-encoding': encoding}))
+
+    def test_compressed_json_bodies_are_decoded(self):
+        data = json.dumps(LARGE).encode('utf-8')
+        for encoding, payload in (('gzip', gzip.compress(data)), ('deflate', zlib.compress(data))):
+            with self.subTest(encoding):
+                result = self.post(self.make_app(), payload, encoding)
+                self.assertEqual(result['body'], {'count': 500})
+
+    def test_error_statuses(self):
+        app = self.make_app(max_body_size=1024)
+        self.assertEqual(self.post(app, gzip.compress(json.dumps(LARGE).encode('utf-8')), 'gzip')['statusCode'], 413)
+        self.assertEqual(self.post(app, b'garbage', 'gzip')['statusCode'], 400)
+        self.assertEqual(self.post(app, b'garbage', 'zstd')['statusCode'], 415)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+import unittest
+from datetime import datetime
+
+from PyLambdAPI import Middleware, Response
+from PyLambdAPI.conditional import etag_matches, http_date, is_not_modified, make_etag, quote_etag
+
+from events import function_url_event, quiet_app, rest_event
+
+UPDATED = datetime(2024, 5, 1, 12, 0, 0)
+
+
+class RequireToken(Middleware):
+    def process_request(self, req_params):
+        if req_params['headers'].get('authorization') != 'Bearer good':
+            return Response(401, {'error': 'Unauthorized'})
+        return req_params
+
+
+class Cors(Middleware):
+    def process_response(self, response):
+        response.headers = {**(response.headers or {}), 'Access-Control-Allow-Origin': '*'}
+        return response
+
+
+class TestConditionalHelpers(unittest.TestCase):
+    def test_etag_matching_is_weak(self):
+        self.assertTrue(etag_matches('"a"', '"a"'))
+        self.assertTrue(etag_matches('W/"a"', '"a"'))
+        self.assertTrue(etag_matches('"x", W/"a"', 'W/"a"'))
+        self.assertTrue(etag_matches(' * ', '"b"'))
+        self.assertFalse(etag_matches('"a"', '"b"'))
+
+    def test_make_and_quote_etag(self):
+        self.assertEqual(make_etag(b'body'), make_etag(b'body'))
+        self.assertNotEqual(make_etag(b'body'), make_etag(b'other'))
+        self.assertEqual(quote_etag(7), '"7"')
+        self.assertEqual(quote_etag('W/"7"'), 'W/"7"')
+
+    def test_if_none_match_wins_over_if_modified_since(self):
+        modified = http_date(UPDATED)
+        self.assertEqual(modified, 'Wed, 01 May 2024 12:00:00 GMT')
+        self.assertTrue(is_not_modified({'if-modified-since': modified}, None, modified))
+        self.assertFalse(is_not_modified({'if-modified-since': 'Tue, 30 Apr 2024 12:00:00 GMT'}, None, modified))
+        self.assertFalse(is_not_modified({'if-modified-since': 'garbage'}, None, modified))
+        self.assertFalse(is_not_modified({'if-none-match': '"other"', 'if-modified-since': modified}, '"a"', modified))
+
+
+class TestConditionalRequests(unittest.TestCase):
+    def setUp(self):
+        self.app = quiet_app(etag=True)
+        self.calls = []
+
+        @self.app.route_decorator('/items', http_methods=['GET', 'POST'])
+        def items(req_params):
+            self.calls.append(1)
+            return {'items': [1, 2, 3]}
+
+        @self.app.route_decorator('/versioned', http_methods=['GET'], etag=lambda req_params: 42,
+                                  last_modified=lambda req_params: UPDATED)
+        def versioned(req_params):
+            self.calls.append(1)
+            return {'version': 42}
+
+    def get(self, path, **headers):
+        return self.app.process_request(function_url_event(path, headers=headers))
+
+    def test_body_hash_etag_and_304(self):
+        first = self.get('/items')
+        etag = first['headers']['ETag']
+        self.assertEqual(self.get('/items')['headers']['ETag'], etag)
+        not_modified = self.get('/items', **{'if-none-match': etag})
+        self.assertEqual(not_modified['statusCode'], 304)
+        self.assertEqual(not_modified['headers'], {'ETag': etag})
+        self.assertFalse(not_modified.get('body'))
+        self.assertEqual(self.get('/items', **{'if-none-match': '"stale"'})['statusCode'], 200)
+
+    def test_unsafe_methods_get_no_etag(self):
+        result = self.app.process_request(function_url_event('/items', method='POST'))
+        self.assertNotIn('ETag', result.get('headers') or {})
+
+    def test_version_tag_skips_the_handler(self):
+        first = self.get('/versioned')
+        self.assertEqual(first['headers']['ETag'], '"42"')
+        self.assertEqual(first['headers']['Last-Modified'], 'Wed, 01 May 2024 12:00:00 GMT')
+        for headers in ({'if-none-match': '"42"'}, {'if-modified-since': 'Wed, 01 May 2024 12:00:00 GMT'}):
+            with self.subTest(headers=headers):
+                result = self.get('/versioned', **headers)
+                self.assertEqual(result['statusCode'], 304)
+                self.assertEqual(result['headers']['ETag'], '"42"')
+        self.assertEqual(len(self.calls), 1)
+
+    def test_version_check_runs_after_request_middleware(self):
+        for is_async in (False, True):
+            with self.subTest(is_async=is_async):
+                app = quiet_app(middlewares=[Cors()])
+                calls = []
+                tags = []
+
+                def version(req_params):
+                    tags.append(1)
+                    return 'v1'
+
+                if is_async:
+                    @app.route_decorator('/doc', http_methods=['GET'], middlewares=[RequireToken()], etag=version)
+                    async def doc(req_params):
+                        calls.append(1)
+                        return {'doc': 1}
+                else:
+                    @app.route_decorator('/doc', http_methods=['GET'], middlewares=[RequireToken()], etag=version)
+                    def doc(req_params):
+                        calls.append(1)
+                        return {'doc': 1}
+
+                anonymous = app.process_request(function_url_event('/doc', headers={'if-none-match': '"v1"'}))
+                self.assertEqual(anonymous['statusCode'], 401)
+                self.assertNotIn('ETag', anonymous['headers'])
+                self.assertEqual(tags, [])
+
+                authorized = {'authorization': 'Bearer good', 'if-none-match': '"v1"'}
+                result = app.process_request(function_url_event('/doc', headers=authorized))
+                self.assertEqual(result['statusCode'], 304)
+                self.assertEqual(result['headers']['ETag'], '"v1"')
+                # The early 304 still passes the response hooks
+                self.assertEqual(result['headers']['Access-Control-Allow-Origin'], '*')
+                self.assertEqual(calls, [])
+
+                fresh = app.process_request(function_url_event('/doc', headers={'authorization': 'Bearer good'}))
+                self.assertEqual(fresh['statusCode'], 200)
+                self.assertEqual(fresh['headers']['Access-Control-Allow-Origin'], '*')
+                self.assertEqual(calls, [1])
+
+    def test_compressed_responses_get_a_weak_etag(self):
+        app = quiet_app(source='api_gateway_proxy', etag=True, compression=True, compression_threshold=10)
+
+        @app.route_decorator('/big', http_methods=['GET'])
+        def big(req_params):
+            return {'data': 'x' * 2000}
+
+        result = app.process_request(rest_event('/big', headers={'Accept-Encoding': 'gzip'}))
+        etag = result['headers']['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        not_modified = app.process_request(rest_event('/big', headers={'Accept-Encoding': 'gzip',
+                                                                       'If-None-Match': etag}))
+        self.assertEqual(not_modified['statusCode'], 304)
+
+    def test_cache_hits_answer_with_304(self):
+        app = quiet_app()
+        calls = []
+
+        @app.route_decorator('/cached', http_methods=['GET'], cache=60, etag=True)
+        def cached(req_params):
+            calls.append(1)
+            return {'a': 1}
+
+        etag = app.process_request(function_url_event('/cached'))['headers']['ETag']
+        result = app.process_request(function_url_event('/cached', headers={'if-none-match': etag}))
+        self.assertEqual(result['statusCode'], 304)
+        self.assertEqual(app.process_request(function_url_event('/cached'))['statusCode'], 200)
+        self.assertEqual(len(calls), 1)
+
+    def test_etag_option_is_checked(self):
+        with self.assertRaises(ValueError):
+            @self.app.route_decorator('/bad', http_methods=['GET'], etag='yes')
+            def bad(req_params):
+                return 'x'
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import json
+import unittest
+
+from PyLambdAPI.datastructures import Headers, MultiValueView
+
+from events import function_url_event, quiet_app, rest_event
+
+
+class TestMultiValueView(unittest.TestCase):
+    def test_multi_value_dict_wins_and_is_not_copied(self):
+        multi = {'id': ['1', '2']}
+        view = MultiValueView({'id': '2'}, multi)
+        self.assertEqual(view['id'], '1')
+        self.assertEqual(view.getall('id'), ['1', '2'])
+        multi['id'].append('3')
+        self.assertEqual(view.getall('id'), ['1', '2', '3'])
+        self.assertIsNot(view.getall('id'), multi['id'])
+
+    def test_comma_joined_v2_values_are_split_from_the_raw_query_string(self):
+        view = MultiValueView({'id': '1,2', 'tag': 'a,b'}, None, 'id=1&id=2&tag=a%2Cb')
+        self.assertEqual(view['id'], '1')
+        self.assertEqual(view.getall('id'), ['1', '2'])
+        # A literal comma in a single value stays intact
+        self.assertEqual(view.getall('tag'), ['a,b'])
+
+    def test_missing_keys(self):
+        view = MultiValueView(None, None)
+        self.assertEqual(len(view), 0)
+        self.assertIsNone(view.get('a'))
+        self.assertEqual(view.getall('a'), [])
+        self.assertEqual(view.getall('a', ['x']), ['x'])
+        with self.assertRaises(KeyError):
+            view['a']
+        with self.assertRaises(KeyError):
+            MultiValueView(None, {'a': []})['a']
+
+    def test_mapping_interface(self):
+        view = MultiValueView({'a': '1', 'b': '2'})
+        self.assertEqual(dict(view), {'a': '1', 'b': '2'})
+        self.assertIn('a', view)
+        self.assertEqual(view.to_dict(), {'a': '1', 'b': '2'})
+
+
+class TestRepeatedQueryParameters(unittest.TestCase):
+    def setUp(self):
+        self.app = quiet_app(source='auto')
+
+        @self.app.route_decorator('/items', http_methods=['GET'])
+        def items(req_params):
+            return {'first': req_params['id'], 'all': req_params.getall('id')}
+
+    def test_every_source(self):
+        events = {
+            'rest': rest_event('/items', query={'id': '2'}, multi_value_query={'id': ['1', '2']}),
+            'v2': function_url_event('/items', query={'id': '1,2'}, raw_query_string='id=1&id=2'),
+        }
+        for name, event in events.items():
+            with self.subTest(name):
+                body = self.app.process_request(event)['body']
+                self.assertEqual(json.loads(body), {'first': '1', 'all': ['1', '2']})
+
+
+class TestHeaders(unittest.TestCase):
+    def test_lookups_ignore_case(self):
+        headers = Headers({'Content-Type': 'application/json', 'x-request-id': 'abc'})
+        self.assertEqual(headers['content-type'], 'application/json')
+        self.assertEqual(headers['X-Request-Id'], 'abc')
+        self.assertIn('CONTENT-TYPE', headers)
+        self.assertNotIn('accept', headers)
+        self.assertIsNone(headers.get('Accept'))
+
+    def test_index_is_only_built_on_a_miss(self):
+        headers = Headers({'content-type': 'text/plain'})
+        self.assertEqual(headers['content-type'], 'text/plain')
+        self.assertIsNone(headers._index)
+        self.assertEqual(headers['Content-Type'], 'text/plain')
+        self.assertEqual(headers._index, {'content-type': 'content-type'})
+
+    def test_multi_value_headers(self):
+        headers = Headers({'Accept': 'b'}, {'Accept': ['a', 'b']})
+        self.assertEqual(headers['accept'], 'a')
+        self.assertEqual(headers.getall('ACCEPT'), ['a', 'b'])
+        self.assertEqual(headers.getall('missing'), [])
+
+    def test_empty_headers(self):
+        headers = Headers(None)
+        self.assertEqual(len(headers), 0)
+        self.assertNotIn('a', headers)
+        with self.assertRaises(KeyError):
+            headers['a']
+
+    def test_request_headers_are_case_insensitive(self):
+        app = quiet_app(source='api_gateway_proxy')
+
+        @app.route_decorator('/', http_methods=['GET'])
+        def handler(req_params):
+            request = req_params.request
+            return {'type': request.headers['content-type'], 'trace': request.headers.get('X-TRACE')}
+
+        result = app.process_request(rest_event('/', headers={'Content-Type': 'text/plain', 'x-trace': '1'}))
+        self.assertEqual(json.loads(result['body']), {'type': 'text/plain', 'trace': '1'})
+
+
+if __name__ == '__main__':
+    unittest.main()
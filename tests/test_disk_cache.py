@@ -0,0 +1,174 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from PyLambdAPI import DiskCache
+from PyLambdAPI.json_codec import available_json_codecs
+
+from events import function_url_event, quiet_app
+
+
+class DiskCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.now = 1000.0
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        options.setdefault('clock', lambda: self.now)
+        return DiskCache(self.directory, **options)
+
+
+class TestDiskCache(DiskCacheTestCase):
+    def test_round_trip_and_expiry(self):
+        cache = self.make_cache()
+        cache.set(('rates',), {'eur': 1.1}, ttl=10, stale_ttl=5)
+        self.assertEqual(cache.lookup(('rates',)), ({'eur': 1.1}, False))
+        self.now += 12
+        self.assertEqual(cache.lookup(('rates',)), ({'eur': 1.1}, True))
+        self.assertIsNone(cache.get(('rates',)))
+        self.now += 10
+        self.assertEqual(cache.lookup(('rates',)), (None, False))
+        self.assertEqual(cache.stats()['expirations'], 1)
+        self.assertEqual(os.listdir(self.directory), ['index.json'])
+
+    def test_size_bound_evicts_least_recently_used(self):
+        cache = self.make_cache(max_bytes=250)
+        for key in 'abc':
+            cache.set(key, 'x' * 100, ttl=60)
+            cache.get('a')
+        self.assertIsNotNone(cache.get('a'))
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertLessEqual(cache.total_bytes, 250)
+
+    def test_entry_larger_than_the_cache_is_refused(self):
+        cache = self.make_cache(max_bytes=10)
+        self.assertFalse(cache.set('big', 'x' * 100, ttl=60))
+        self.assertEqual(len(cache), 0)
+
+    def test_mmap_reads_with_every_codec(self):
+        value = {'statusCode': 200, 'body': 'é' * 5000}
+        for codec in available_json_codecs():
+            with self.subTest(codec=codec.name):
+                cache = self.make_cache(json_codec=codec)
+                cache.set(codec.name, value, ttl=60)
+                self.assertEqual(cache.get(codec.name), value)
+
+    def test_corrupt_entry_is_a_miss(self):
+        cache = self.make_cache()
+        cache.set('key', {'a': 1}, ttl=60)
+        with open(cache._path(cache._name('key')), 'w') as entry_file:
+            entry_file.write('{trunc')
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.total_bytes, 0)
+
+    def test_clear(self):
+        cache = self.make_cache()
+        cache.set('a', 1, ttl=60)
+        cache.set('b', 2, ttl=60)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(os.listdir(self.directory), ['index.json'])
+
+    def test_index_is_rediscovered_by_a_new_instance(self):
+        self.make_cache().set('ref', [1, 2, 3], ttl=60)
+        cache = self.make_cache()
+        self.assertEqual(cache.get('ref'), [1, 2, 3])
+
+    def test_unreadable_index_starts_empty(self):
+        with open(os.path.join(self.directory, 'index.json'), 'w') as index_file:
+            index_file.write('{not json')
+        with self.assertLogs('PyLambdAPI.disk_cache', 'WARNING'):
+            cache = self.make_cache()
+        self.assertEqual(len(cache), 0)
+
+    def test_malformed_index_starts_empty(self):
+        self.make_cache().set('ref', [1, 2, 3], ttl=60)
+        name = 'a' * 64
+        for index in ('{"entries": 1}', '[1]', '[["%s", 10]]' % name, '[["%s", "10", 5000, 5000]]' % name, 'null'):
+            with self.subTest(index=index):
+                with open(os.path.join(self.directory, 'index.json'), 'w') as index_file:
+                    index_file.write(index)
+                with self.assertLogs('PyLambdAPI.disk_cache', 'WARNING'):
+                    cache = self.make_cache()
+                self.assertEqual((len(cache), cache.total_bytes), (0, 0))
+                self.assertEqual(os.listdir(self.directory), ['index.json'])
+
+    def test_response_bodies_are_stored_raw_after_the_header(self):
+        cache = self.make_cache()
+        value = {'statusCode': 200, 'headers': {'Content-Type': 'text/plain'}, 'body': 'line\n"é"\n'}
+        cache.set('page', value, ttl=60)
+        with open(cache._path(cache._name('page')), 'rb') as entry_file:
+            header, body = entry_file.read().split(b'\n', 1)
+        self.assertEqual(body, value['body'].encode('utf-8'))
+        self.assertNotIn(b'body', header)
+        self.assertEqual(cache.get('page'), value)
+        self.assertEqual(cache.total_bytes, len(header) + 1 + len(body))
+
+    def test_only_its_own_files_are_removed(self):
+        unrelated = os.path.join(self.directory, 'important.txt')
+        with open(unrelated, 'w') as unrelated_file:
+            unrelated_file.write('keep me')
+        os.mkdir(os.path.join(self.directory, 'spool'))
+        orphan = os.path.join(self.directory, 'a' * 64 + '.json')
+        leftover = os.path.join(self.directory, 'index.json.123.456.tmp')
+        for path in (orphan, leftover):
+            with open(path, 'w') as own_file:
+                own_file.write('{}')
+
+        self.make_cache()
+
+        self.assertTrue(os.path.exists(unrelated))
+        self.assertTrue(os.path.isdir(os.path.join(self.directory, 'spool')))
+        self.assertFalse(os.path.exists(orphan))
+        self.assertFalse(os.path.exists(leftover))
+
+    def test_index_names_outside_the_directory_are_ignored(self):
+        with open(os.path.join(self.directory, 'index.json'), 'w') as index_file:
+            index_file.write('[["../escape", 10, 5000.0, 5000.0]]')
+        self.assertEqual(len(self.make_cache()), 0)
+
+
+class TestDiskTier(DiskCacheTestCase):
+    def test_large_responses_go_to_disk(self):
+        for source in ('http_api', 'function_url'):
+            with self.subTest(source=source):
+                shutil.rmtree(self.directory)
+                self.check_large_responses_go_to_disk(source)
+
+    def check_large_responses_go_to_disk(self, source):
+        disk_cache = self.make_cache(min_entry_size=500)
+        app = quiet_app(source=source, disk_cache=disk_cache)
+        calls = []
+
+        @app.route_decorator('/big', http_methods=['GET'], cache=60)
+        def big(req_params):
+            calls.append(1)
+            return {'data': 'x' * 1000}
+
+        @app.route_decorator('/small', http_methods=['GET'], cache=60)
+        def small(req_params):
+            return {'ok': True}
+
+        first = app.process_request(function_url_event('/big'))
+        second = app.process_request(function_url_event('/big'))
+        app.process_request(function_url_event('/small'))
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(disk_cache), 1)
+        self.assertEqual(len(app.response_cache), 1)
+        self.assertEqual(disk_cache.stats()['hits'], 1)
+
+    def test_disk_cache_option_is_checked(self):
+        with self.assertRaises(ValueError):
+            quiet_app(disk_cache=self.directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
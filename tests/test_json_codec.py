@@ -0,0 +1,109 @@
+import json
+import unittest
+from dataclasses import dataclass
+from datetime import date
+from unittest import mock
+
+from PyLambdAPI import json_codec
+from PyLambdAPI.datastructures import Headers
+from PyLambdAPI.json_codec import JsonCodec, available_json_codecs, get_json_codec
+
+from events import function_url_event, quiet_app, rest_event
+
+
+class MissingCodec(JsonCodec):
+    def __init__(self):
+        raise ImportError("not installed")
+
+
+class Upper(JsonCodec):
+    name = 'upper'
+
+    def dumps(self, obj):
+        return json.dumps(obj).upper()
+
+
+class Score(float):
+    pass
+
+
+@dataclass
+class Point:
+    x: int
+
+
+class TestCodecSelection(unittest.TestCase):
+    def test_auto_picks_the_first_installed_backend(self):
+        self.assertEqual(get_json_codec('auto').name, available_json_codecs()[0].name)
+        self.assertEqual(get_json_codec(None).name, available_json_codecs()[0].name)
+
+    def test_auto_falls_back_when_backends_are_missing(self):
+        missing = dict.fromkeys(['orjson', 'msgspec', 'ujson'], MissingCodec)
+        with mock.patch.dict(json_codec.JSON_CODECS, missing):
+            self.assertEqual(get_json_codec('auto').name, 'json')
+            with self.assertRaises(ImportError):
+                get_json_codec('orjson')
+
+    def test_unknown_name_is_rejected(self):
+        with self.assertRaises(ValueError):
+            get_json_codec('yaml')
+
+    def test_custom_codec_objects(self):
+        codec = Upper()
+        self.assertIs(get_json_codec(codec), codec)
+        with self.assertRaises(ValueError):
+            get_json_codec(object())
+
+
+class TestCodecs(unittest.TestCase):
+    def test_backends_agree(self):
+        value = {'a': [1, 2.5, None, True], 'b': {'c': 'é'}, 3: 'int key'}
+        expected = json.loads(json.dumps(value))
+        for codec in available_json_codecs():
+            with self.subTest(codec=codec.name):
+                self.assertEqual(json.loads(codec.dumps(value)), expected)
+                self.assertEqual(codec.loads(codec.dumps(value)), expected)
+                self.assertEqual(codec.loads(b'{"x": 1}'), {'x': 1})
+                self.assertEqual(codec.loads(memoryview(b'{"x": 1}')), {'x': 1})
+
+    def test_values_outside_the_fast_path_match_stdlib(self):
+        value = {'big': 2 ** 70, 'negative': -2 ** 65, 'score': Score(1.5), 'scores': [Score(0.25)]}
+        expected = json.loads(json.dumps(value))
+        for codec in available_json_codecs():
+            with self.subTest(codec=codec.name):
+                self.assertEqual(json.loads(codec.dumps(value)), expected)
+                for unsupported in (date(2024, 5, 1), Point(1), {1, 2}):
+                    with self.assertRaises(TypeError):
+                        codec.dumps({'value': unsupported})
+
+    def test_invalid_json_raises_value_error(self):
+        for codec in available_json_codecs():
+            with self.subTest(codec=codec.name), self.assertRaises(ValueError):
+                codec.loads(b'{bad')
+
+    def test_mappings_and_lazy_params_are_encoded(self):
+        request = function_url_event('/', query={'q': '1'}, headers={'X-A': 'b'})
+        for codec in available_json_codecs():
+            with self.subTest(codec=codec.name):
+                app = quiet_app(json_codec=codec)
+
+                @app.route_decorator('/', http_methods=['GET'])
+                def echo(req_params):
+                    return {'params': req_params, 'headers': Headers({'X-A': 'b'})}
+
+                body = app.process_request(request)['body']
+                self.assertEqual(json.loads(codec.dumps(body)),
+                                 {'params': {'q': '1', 'headers': {'X-A': 'b'}}, 'headers': {'X-A': 'b'}})
+
+    def test_app_uses_its_codec_for_responses(self):
+        app = quiet_app(source='api_gateway_proxy', json_codec=Upper())
+
+        @app.route_decorator('/', http_methods=['GET'])
+        def hello(req_params):
+            return {'hello': 'world'}
+
+        self.assertEqual(app.process_request(rest_event('/'))['body'], '{"HELLO": "WORLD"}')
+
+
+if __name__ == '__main__':
+    unittest.main()
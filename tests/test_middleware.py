@@ -0,0 +1,95 @@
+import unittest
+
+from PyLambdAPI import Middleware, Response
+
+from events import function_url_event, quiet_app
+
+
+class Record(Middleware):
+    def __init__(self, name, calls, deny=False):
+        super().__init__()
+        self.name = name
+        self.calls = calls
+        self.deny = deny
+
+    def process_request(self, req_params):
+        self.calls.append(f'{self.name}:request')
+        if self.deny:
+            return Response(403, {'error': 'Forbidden'})
+        req_params['seen'] = req_params.get('seen', '') + self.name
+        return req_params
+
+    def process_response(self, response):
+        self.calls.append(f'{self.name}:response')
+        headers = response.headers or {}
+        response.headers = {**headers, 'X-Order': headers.get('X-Order', '') + self.name}
+        return response
+
+
+class TestOnion(unittest.TestCase):
+    def make_app(self, deny=None):
+        self.calls = []
+        app = quiet_app(middlewares=[Record('a', self.calls, deny == 'a')])
+        app.use_middleware(Record('b', self.calls, deny == 'b'))
+
+        @app.route_decorator('/', http_methods=['GET'], middlewares=[Record('c', self.calls, deny == 'c')])
+        def handler(req_params):
+            self.calls.append('handler')
+            return {'seen': req_params['seen']}
+        return app
+
+    def test_requests_go_in_and_responses_come_out_in_reverse(self):
+        result = self.make_app().process_request(function_url_event('/'))
+        self.assertEqual(self.calls, ['a:request', 'b:request', 'c:request', 'handler',
+                                      'c:response', 'b:response', 'a:response'])
+        self.assertEqual(result['body'], {'seen': 'abc'})
+        self.assertEqual(result['headers']['X-Order'], 'cba')
+
+    def test_short_circuit_only_passes_the_outer_layers(self):
+        result = self.make_app(deny='b').process_request(function_url_event('/'))
+        self.assertEqual(result['statusCode'], 403)
+        self.assertEqual(self.calls, ['a:request', 'b:request', 'a:response'])
+        self.assertEqual(result['headers']['X-Order'], 'a')
+
+    def test_middleware_must_be_a_middleware(self):
+        app = quiet_app()
+        with self.assertRaises(ValueError):
+            app.use_middleware(object())
+
+
+class LegacyDeny(Middleware):
+    # Written against the old API: only the default_* hooks are overridden
+    def default_process_request(self, req_params, **kwargs):
+        return Response(403, {'error': 'Forbidden'})
+
+
+class LegacyHeader(Middleware):
+    def default_process_response(self, response, **kwargs):
+        response.headers = {**(response.headers or {}), 'X-Legacy': '1'}
+        return response
+
+
+class TestLegacyMiddleware(unittest.TestCase):
+    def test_default_process_request_override_short_circuits(self):
+        app = quiet_app()
+
+        @app.route_decorator('/private', http_methods=['GET'], middlewares=[LegacyDeny()])
+        def private(req_params):
+            return 'secret'
+
+        result = app.process_request(function_url_event('/private'))
+        self.assertEqual(result['statusCode'], 403)
+
+    def test_default_process_response_override_runs_for_async_routes(self):
+        app = quiet_app(middlewares=[LegacyHeader()])
+
+        @app.route_decorator('/async', http_methods=['GET'])
+        async def handler(req_params):
+            return 'ok'
+
+        result = app.process_request(function_url_event('/async'))
+        self.assertEqual(result['headers']['X-Legacy'], '1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import base64
+import unittest
+
+from PyLambdAPI.multipart import MultipartError, iter_base64_chunks, parse_content_type, parse_multipart
+
+from events import function_url_event, quiet_app
+
+BOUNDARY = 'xYzZY'
+FILE_DATA = bytes(range(256)) * 8 + b'\r\n--xYzZ not quite a delimiter\r\n'
+
+
+def multipart_body(boundary=BOUNDARY):
+    return (
+        f'preamble\r\n--{boundary}\r\n'
+        'Content-Disposition: form-data; name="title"\r\n\r\n'
+        'Hello, world\r\n'
+        f'--{boundary}\r\n'
+        'Content-Disposition: form-data; name="upload"; filename="data.bin"\r\n'
+        'Content-Type: application/octet-stream\r\n\r\n'
+    ).encode('utf-8') + FILE_DATA + f'\r\n--{boundary}--\r\nepilogue'.encode('utf-8')
+
+
+def chunked(data, size):
+    return [data[start:start + size] for start in range(0, len(data), size)]
+
+
+class TestParseMultipart(unittest.TestCase):
+    def check_parts(self, parts):
+        self.assertEqual([part.name for part in parts], ['title', 'upload'])
+        self.assertEqual(parts[0].value, 'Hello, world')
+        self.assertFalse(parts[0].is_file)
+        self.assertTrue(parts[1].is_file)
+        self.assertEqual(parts[1].filename, 'data.bin')
+        self.assertEqual(parts[1].content_type, 'application/octet-stream')
+        self.assertEqual(parts[1].read(), FILE_DATA)
+        self.assertEqual(parts[1].size, len(FILE_DATA))
+
+    def test_delimiters_split_across_every_chunk_boundary(self):
+        body = multipart_body()
+        for size in list(range(1, 40)) + [len(body)]:
+            with self.subTest(chunk_size=size):
+                self.check_parts(list(parse_multipart(chunked(body, size), BOUNDARY)))
+
+    def test_large_files_spool_to_disk(self):
+        parts = list(parse_multipart([multipart_body()], BOUNDARY, spool_size=100))
+        self.assertTrue(parts[1].file._rolled)
+        self.assertEqual(parts[1].read(), FILE_DATA)
+        small = list(parse_multipart([multipart_body()], BOUNDARY))
+        self.assertFalse(small[1].file._rolled)
+
+    def test_malformed_bodies(self):
+        body = multipart_body()
+        cases = {
+            'truncated': ([body[:len(body) // 2]], BOUNDARY),
+            'no closing delimiter': ([body.replace(f'--{BOUNDARY}--'.encode(), b'')], BOUNDARY),
+            'missing boundary': ([body], None),
+            'garbage after delimiter': ([f'--{BOUNDARY}junk\r\n'.encode()], BOUNDARY),
+        }
+        for name, (chunks, boundary) in cases.items():
+            with self.subTest(name), self.assertRaises(MultipartError):
+                list(parse_multipart(chunks, boundary))
+
+    def test_base64_chunks(self):
+        data = bytes(range(256)) * 100
+        encoded = base64.b64encode(data).decode('ascii')
+        chunks = list(iter_base64_chunks(encoded, chunk_size=1000))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b''.join(chunks), data)
+        with self.assertRaises(MultipartError):
+            list(iter_base64_chunks('not*base64'))
+
+    def test_parse_content_type(self):
+        self.assertEqual(parse_content_type('Multipart/Form-Data; boundary="a b"; charset=utf-8'),
+                         ('multipart/form-data', {'boundary': 'a b', 'charset': 'utf-8'}))
+        self.assertEqual(parse_content_type(None), ('', {}))
+
+
+class TestMultipartRequests(unittest.TestCase):
+    def setUp(self):
+        self.app = quiet_app()
+
+        @self.app.route_decorator('/upload', http_methods=['POST'])
+        def upload(req_params):
+            request = req_params.request
+            upload = request.files['upload']
+            return {'title': req_params['title'], 'size': upload.size, 'data': upload.read() == FILE_DATA}
+
+    def post(self, body, is_base64_encoded=True, boundary=BOUNDARY):
+        return self.app.process_request(function_url_event(
+            '/upload', method='POST', body=body, is_base64_encoded=is_base64_encoded,
+            headers={'content-type': f'multipart/form-data; boundary={boundary}'}))
+
+    def test_base64_upload(self):
+        result = self.post(multipart_body())
+        self.assertEqual(result['body'], {'title': 'Hello, world', 'size': len(FILE_DATA), 'data': True})
+
+    def test_malformed_upload_is_a_400(self):
+        result = self.post(multipart_body()[:100])
+        self.assertEqual(result['statusCode'], 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+import logging
+import unittest
+
+from PyLambdAPI.json_codec import available_json_codecs
+from PyLambdAPI.lambda_flask import EVENT_ADAPTER, HTTPError, RawRequest, RequestParams
+
+from events import function_url_event, quiet_app
+
+
+class TestLazyParams(unittest.TestCase):
+    def request(self, **kwargs):
+        return EVENT_ADAPTER.process_event(function_url_event(**kwargs), 'function_url')
+
+    def test_nothing_is_parsed_until_first_access(self):
+        request = self.request(path='/items', method='POST', body='{bad', query={'a': '1'},
+                               headers={'content-type': 'application/json'})
+        params = request.params()
+        self.assertIsInstance(params, RequestParams)
+        self.assertFalse(params.loaded)
+        self.assertIs(params.request, request)
+        # The raw body is only decoded once the merged dict is read
+        with self.assertRaises(HTTPError) as error:
+            params['a']
+        self.assertEqual(error.exception.status_code, 400)
+
+    def test_query_body_and_headers_are_merged_on_access(self):
+        request = self.request(path='/items', method='POST', query={'a': '1', 'b': '2'}, body={'b': 3},
+                               headers={'content-type': 'application/json'})
+        params = request.params()
+        self.assertEqual(params['a'], '1')
+        self.assertEqual(params['b'], 3)
+        self.assertEqual(params['headers']['content-type'], 'application/json')
+        self.assertTrue(params.loaded)
+
+    def test_base64_body(self):
+        request = self.request(method='POST', body={'x': 1}, is_base64_encoded=True,
+                               headers={'content-type': 'application/json'})
+        self.assertEqual(request.json, {'x': 1})
+        self.assertEqual(request.params()['x'], 1)
+
+    def test_empty_body(self):
+        request = self.request()
+        self.assertIsNone(request.body)
+        self.assertEqual(request.json, {})
+        self.assertEqual(dict(request.params()), {'headers': {}})
+
+    def test_handler_that_ignores_params_never_parses_them(self):
+        app = quiet_app()
+        seen = []
+
+        @app.route_decorator('/items/{id}', http_methods=['POST'])
+        def create(req_params):
+            seen.append(req_params)
+            return 'ok'
+
+        result = app.process_request(function_url_event('/items/1', method='POST', body='{bad',
+                                                        headers={'content-type': 'application/json'}))
+        self.assertEqual(result['statusCode'], 200)
+        self.assertFalse(seen[0].loaded)
+
+    def test_path_params_are_merged(self):
+        app = quiet_app()
+
+        @app.route_decorator('/items/{id}', http_methods=['GET'])
+        def item(req_params):
+            return {'id': req_params['id'], 'q': req_params.get('q')}
+
+        result = app.process_request(function_url_event('/items/5', query={'q': 'x'}))
+        self.assertEqual(result['body'], {'id': '5', 'q': 'x'})
+
+
+class TestMalformedBody(unittest.TestCase):
+    def make_app(self, **options):
+        app = quiet_app(**options)
+        self.seen = []
+
+        @app.route_decorator('/items', http_methods=['POST'])
+        def create(req_params):
+            self.seen.append(dict(req_params))
+            return {'ok': True}
+        return app
+
+    def post(self, app, body='{bad'):
+        return app.process_request(function_url_event('/items', method='POST', body=body,
+                                                      headers={'content-type': 'application/json'}))
+
+    def test_malformed_json_is_a_400_with_request_logging(self):
+        for codec in available_json_codecs():
+            with self.subTest(codec=codec.name):
+                app = self.make_app(json_codec=codec, enable_request_logging=True, enable_response_logging=True)
+                with self.assertLogs('PyLambdAPI.lambda_flask', logging.INFO):
+                    result = self.post(app)
+                self.assertEqual(result['statusCode'], 400)
+                self.assertEqual(self.seen, [])
+
+    def test_malformed_json_is_a_400_without_logging(self):
+        result = self.post(self.make_app())
+        self.assertEqual(result['statusCode'], 400)
+        self.assertEqual(self.seen, [])
+
+    def test_misrouted_requests_are_logged_without_parsing_the_body(self):
+        app = self.make_app(enable_request_logging=True, enable_response_logging=True)
+        for path, method, status in (('/nowhere', 'POST', 404), ('/items', 'PUT', 405)):
+            with self.subTest(status=status):
+                event = function_url_event(path, method=method, body='{bad',
+                                           headers={'content-type': 'application/json'})
+                with self.assertLogs('PyLambdAPI.lambda_flask', logging.INFO) as logs:
+                    result = app.process_request(event)
+                self.assertEqual(result['statusCode'], status)
+                self.assertIn(f'Request - Method: {method}, Path: {path}', logs.output[0])
+                self.assertNotIn('Params', logs.output[0])
+
+    def test_failed_load_is_not_cached_as_empty(self):
+        event = function_url_event('/items', method='POST', body='{bad', headers={'content-type': 'application/json'})
+        params = EVENT_ADAPTER.process_event(event, 'function_url').params()
+        for _ in range(2):
+            with self.assertRaises(HTTPError):
+                params.load()
+        self.assertFalse(params.loaded)
+
+
+class TestRawRoutes(unittest.TestCase):
+    def setUp(self):
+        self.app = quiet_app()
+        self.seen = []
+
+        @self.app.route_decorator('/webhook/{id}', http_methods=['POST'], raw=True)
+        def webhook(request):
+            self.seen.append(request)
+            return {'body': request.body, 'id': request.path_params['id']}
+
+    def test_handler_gets_the_event_unparsed(self):
+        event = function_url_event('/webhook/7', method='POST', body='{not json',
+                                   headers={'content-type': 'application/json', 'X-Sig': 'abc'})
+        result = self.app.process_request(event)
+        self.assertEqual(result['body'], {'body': '{not json', 'id': '7'})
+        request = self.seen[0]
+        self.assertIsInstance(request, RawRequest)
+        self.assertIs(request.event, event)
+        self.assertEqual((request.method, request.path, request.source), ('POST', '/webhook/7', 'function_url'))
+        self.assertEqual(request.headers['x-sig'], 'abc')
+        self.assertFalse(request.is_base64_encoded)
+        # Nothing was decoded or merged on the way in
+        self.assertIsNone(request.request.req_params)
+
+    def test_request_logging_does_not_parse_the_body(self):
+        app = self.app
+        app.enable_request_logging = True
+        event = function_url_event('/webhook/7', method='POST', body='{not json',
+                                   headers={'content-type': 'application/json'})
+        with self.assertLogs('PyLambdAPI.lambda_flask', logging.INFO):
+            result = app.process_request(event)
+        self.assertEqual(result['statusCode'], 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,164 @@
+import base64
+import json
+import unittest
+
+from PyLambdAPI import Response
+from PyLambdAPI.lambda_flask import EVENT_ADAPTER, detect_source
+
+from events import alb_event, function_url_event, quiet_app, rest_event
+
+
+class TestResponseFormats(unittest.TestCase):
+    def test_rest_api_uses_multi_value_headers_for_cookies(self):
+        result = Response(200, {'a': 1}, {'X-A': '1'}, cookies=['a=1', 'b=2']).json(source='api_gateway_proxy')
+        self.assertEqual(result['headers'], {'X-A': '1', 'Content-Type': 'application/json'})
+        self.assertEqual(result['multiValueHeaders'], {'Set-Cookie': ['a=1', 'b=2']})
+        self.assertEqual(result['body'], '{"a": 1}')
+
+    def test_payload_v2_uses_cookies_and_joins_multi_value_headers(self):
+        result = Response(200, 'x', multiValueHeaders={'X-A': ['1', '2'], 'Set-Cookie': ['a=1']},
+                          cookies=['b=2']).json(source='http_api')
+        self.assertEqual(result['headers'], {'X-A': '1,2'})
+        self.assertEqual(result['cookies'], ['b=2', 'a=1'])
+        self.assertNotIn('multiValueHeaders', result)
+
+    def test_function_url_keeps_json_bodies_unserialized(self):
+        self.assertEqual(Response(200, {'a': 1}).json(source='function_url')['body'], {'a': 1})
+
+    def test_bytes_are_base64_encoded(self):
+        result = Response(200, b'\xff').json(source='http_api')
+        self.assertTrue(result['isBase64Encoded'])
+        self.assertEqual(base64.b64decode(result['body']), b'\xff')
+
+    def test_alb_single_value(self):
+        result = Response(201, 'x', multiValueHeaders={'X-A': ['1', '2']}).json(source='alb')
+        self.assertEqual(result['headers'], {'X-A': '1,2'})
+        self.assertNotIn('Set-Cookie', result['headers'])
+        self.assertEqual(result['statusDescription'], '201 Created')
+        self.assertIs(result['isBase64Encoded'], False)
+
+    def test_alb_single_value_with_one_cookie(self):
+        cookie = 'id=1; Expires=Wed, 21 Oct 2026 07:28:00 GMT'
+        result = Response(200, 'x', cookies=[cookie]).json(source='alb')
+        self.assertEqual(result['headers'], {'Set-Cookie': cookie})
+
+    def test_alb_single_value_refuses_several_cookies(self):
+        with self.assertRaises(ValueError):
+            Response(200, 'x', cookies=['a=1', 'b=2']).json(source='alb')
+
+    def test_alb_multi_value(self):
+        result = Response(200, 'x', {'X-A': '1'}, cookies=['a=1', 'b=2']).json(source='alb', multi_value_headers=True)
+        self.assertEqual(result['multiValueHeaders'], {'X-A': ['1'], 'Set-Cookie': ['a=1', 'b=2']})
+        self.assertNotIn('headers', result)
+
+
+class TestHandlerResults(unittest.TestCase):
+    def respond(self, result, source='api_gateway_proxy'):
+        app = quiet_app(source=source)
+
+        @app.route_decorator('/', http_methods=['GET'])
+        def handler(req_params):
+            return result
+
+        event = rest_event('/') if source == 'api_gateway_proxy' else function_url_event('/')
+        return app.process_request(event)
+
+    def test_json_values_are_serialized_once(self):
+        result = self.respond({'a': [1, 2]})
+        self.assertEqual(result['statusCode'], 200)
+        self.assertEqual(json.loads(result['body']), {'a': [1, 2]})
+        self.assertEqual(result['headers'], {'Content-Type': 'application/json'})
+        self.assertFalse(result.get('isBase64Encoded'))
+
+    def test_strings_pass_through(self):
+        result = self.respond('plain')
+        self.assertEqual(result['body'], 'plain')
+        self.assertNotIn('Content-Type', result.get('headers') or {})
+
+    def test_proxy_style_dicts_keep_their_fields(self):
+        result = self.respond({'statusCode': 202, 'body': {'queued': True}, 'headers': {'X-A': '1'},
+                               'cookies': ['a=1']})
+        self.assertEqual(result['statusCode'], 202)
+        self.assertEqual(json.loads(result['body']), {'queued': True})
+        self.assertEqual(result['headers']['X-A'], '1')
+        self.assertEqual(result['multiValueHeaders'], {'Set-Cookie': ['a=1']})
+
+    def test_response_objects_keep_their_content_type(self):
+        result = self.respond(Response(201, {'a': 1}, {'content-type': 'application/vnd.api+json'}))
+        self.assertEqual(result['statusCode'], 201)
+        self.assertEqual(result['headers'], {'content-type': 'application/vnd.api+json'})
+
+    def test_bytes_and_none(self):
+        self.assertEqual(base64.b64decode(self.respond(b'\x00\x01')['body']), b'\x00\x01')
+        self.assertEqual(self.respond(None)['body'], '')
+
+    def test_function_url_results(self):
+        self.assertEqual(self.respond({'a': 1}, source='function_url'), {'statusCode': 200, 'body': {'a': 1}})
+
+
+class TestSourceDetection(unittest.TestCase):
+    def setUp(self):
+        self.app = quiet_app(source='auto')
+
+        @self.app.route_decorator('/items', http_methods=['GET'])
+        def items(req_params):
+            return {'q': req_params.get('q')}
+
+    def test_each_source_answers_in_its_own_format(self):
+        rest = self.app.process_request(rest_event('/items', query={'q': 'a'}))
+        self.assertEqual(json.loads(rest['body']), {'q': 'a'})
+        self.assertNotIn('statusDescription', rest)
+
+        v2 = self.app.process_request(function_url_event('/items', query={'q': 'b'}))
+        self.assertEqual(json.loads(v2['body']), {'q': 'b'})
+
+        alb = self.app.process_request(alb_event('/items', query={'q': 'a%20b'}))
+        self.assertEqual(json.loads(alb['body']), {'q': 'a b'})
+        self.assertEqual(alb['statusDescription'], '200 OK')
+
+        alb_multi = self.app.process_request(alb_event('/items', query={'q': ['c']}, multi_value=True))
+        self.assertEqual(alb_multi['multiValueHeaders'], {'Content-Type': ['application/json']})
+
+    def test_unknown_event_shape_is_an_error(self):
+        with self.assertLogs('PyLambdAPI.lambda_flask', 'ERROR'):
+            result = self.app.process_request({'foo': 'bar'})
+        self.assertEqual(result['statusCode'], 500)
+
+    def test_several_cookies_on_single_value_alb_fail_loudly(self):
+        app = quiet_app(source='alb')
+
+        @app.route_decorator('/login', http_methods=['POST'])
+        def login(req_params):
+            return Response(200, 'ok', cookies=['a=1', 'b=2'])
+
+        with self.assertLogs('PyLambdAPI.lambda_flask', 'ERROR'):
+            result = app.process_request(alb_event('/login', method='POST'))
+        self.assertEqual(result['statusCode'], 500)
+
+
+class TestEventParsing(unittest.TestCase):
+    def test_detect_source(self):
+        self.assertEqual(detect_source(function_url_event()), 'http_api')
+        self.assertEqual(detect_source(rest_event()), 'api_gateway_proxy')
+        self.assertEqual(detect_source(alb_event()), 'alb')
+        with self.assertRaises(ValueError):
+            detect_source({'requestContext': {}})
+
+    def test_payload_v2_cookies_and_raw_query_string(self):
+        event = function_url_event('/items', query={'a': '1'}, cookies=['s=1', 't=2'])
+        request = EVENT_ADAPTER.process_event(event, 'http_api')
+        self.assertEqual(request.source, 'http_api')
+        self.assertEqual(request.cookies, ['s=1', 't=2'])
+        self.assertEqual(request.raw_query_string, 'a=1')
+
+    def test_alb_multi_value_headers_reach_the_params(self):
+        event = alb_event('/items', query={'q': ['a%2Bb']}, headers={'x-a': ['1', '2']}, multi_value=True)
+        request = EVENT_ADAPTER.process_event(event, 'alb')
+        self.assertTrue(request.multi_value_response)
+        self.assertEqual(request.query.getall('q'), ['a+b'])
+        self.assertEqual(request.params()['headers'], {'x-a': '1'})
+        self.assertEqual(request.headers.getall('X-A'), ['1', '2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+import unittest
+import uuid
+
+from PyLambdAPI import Middleware
+from PyLambdAPI.lambda_flask import Route, Router
+
+from events import function_url_event, quiet_app
+
+
+class TestRouter(unittest.TestCase):
+    def setUp(self):
+        self.router = Router()
+        self.routes = {}
+        for path in ('/users', '/users/me', '/users/{id}', '/users/{id}/orders/{order}', '/files/{path+}'):
+            self.routes[path] = Route(path)
+            self.router.add(self.routes[path])
+
+    def test_static_paths_match_without_params(self):
+        self.assertEqual(self.router.match('/users'), (self.routes['/users'], None))
+
+    def test_params_are_captured(self):
+        route, params = self.router.match('/users/42/orders/7')
+        self.assertIs(route, self.routes['/users/{id}/orders/{order}'])
+        self.assertEqual(params, {'id': '42', 'order': '7'})
+
+    def test_static_segment_wins_over_param(self):
+        self.assertIs(self.router.match('/users/me')[0], self.routes['/users/me'])
+        self.assertIs(self.router.match('/users/you')[0], self.routes['/users/{id}'])
+
+    def test_greedy_segment_takes_the_rest_of_the_path(self):
+        route, params = self.router.match('/files/a/b/c.txt')
+        self.assertIs(route, self.routes['/files/{path+}'])
+        self.assertEqual(params, {'path': 'a/b/c.txt'})
+
+    def test_unknown_paths_do_not_match(self):
+        self.assertIsNone(self.router.match('/users/42/unknown')[0])
+        self.assertIsNone(self.router.match('/nothing')[0])
+
+    def test_conflicting_templates_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self.router.add(Route('/users/{id}'))
+        with self.assertRaises(ValueError):
+            self.router.add(Route('/files/{rest+}'))
+
+    def test_malformed_templates_are_rejected(self):
+        for path in ('/a/{}', '/a/{rest+}/b', '/a/x{id}', '/a/{id:nope}'):
+            with self.subTest(path=path), self.assertRaises(ValueError):
+                self.router.add(Route(path))
+
+
+class TestRouting(unittest.TestCase):
+    def setUp(self):
+        self.app = quiet_app()
+
+        @self.app.route_decorator('/users/{id}', http_methods=['GET', 'DELETE'])
+        def user(req_params):
+            return {'id': req_params['id']}
+
+    def test_path_params_reach_the_handler(self):
+        result = self.app.process_request(function_url_event('/users/42'))
+        self.assertEqual(result, {'statusCode': 200, 'body': {'id': '42'}})
+
+    def test_404_for_unknown_path(self):
+        self.assertEqual(self.app.process_request(function_url_event('/nope'))['statusCode'], 404)
+
+    def test_405_for_unregistered_method(self):
+        self.assertEqual(self.app.process_request(function_url_event('/users/42', method='PUT'))['statusCode'], 405)
+
+
+class TestPathConverters(unittest.TestCase):
+    def setUp(self):
+        self.router = Router()
+        self.router.add_converter('upper', lambda value: value.upper())
+        self.routes = {}
+        for path in ('/items/{id:int}', '/items/{id:float}', '/items/{name}', '/keys/{key:uuid}', '/tags/{tag:upper}'):
+            self.routes[path] = Route(path)
+            self.router.add(self.routes[path])
+
+    def test_int_segments_are_converted(self):
+        route, params = self.router.match('/items/-42')
+        self.assertIs(route, self.routes['/items/{id:int}'])
+        self.assertEqual(params, {'id': -42})
+
+    def test_failed_conversion_falls_through_to_the_next_template(self):
+        route, params = self.router.match('/items/1.5')
+        self.assertIs(route, self.routes['/items/{id:float}'])
+        self.assertEqual(params, {'id': 1.5})
+        for segment in ('nan', '1_000', '1e', '+1', '1.5x'):
+            route, params = self.router.match(f'/items/{segment}')
+            self.assertIs(route, self.routes['/items/{name}'])
+            self.assertEqual(params, {'name': segment})
+
+    def test_uuid_converter(self):
+        key = uuid.uuid4()
+        self.assertEqual(self.router.match(f'/keys/{key}')[1], {'key': key})
+        self.assertIsNone(self.router.match('/keys/not-a-uuid')[0])
+
+    def test_custom_converter(self):
+        self.assertEqual(self.router.match('/tags/new')[1], {'tag': 'NEW'})
+
+    def test_converter_must_be_callable(self):
+        with self.assertRaises(ValueError):
+            self.router.add_converter('bad', 'not callable')
+
+    def test_invalid_segment_is_a_404(self):
+        app = quiet_app()
+
+        @app.route_decorator('/orders/{id:int}', http_methods=['GET'])
+        def order(req_params):
+            return {'id': req_params['id']}
+
+        self.assertEqual(app.process_request(function_url_event('/orders/7'))['body'], {'id': 7})
+        self.assertEqual(app.process_request(function_url_event('/orders/seven'))['statusCode'], 404)
+
+
+class Tag(Middleware):
+    def process_response(self, response):
+        response.headers = {**(response.headers or {}), 'X-Tag': '1'}
+        return response
+
+
+class TestDispatchTable(unittest.TestCase):
+    def setUp(self):
+        self.app = quiet_app()
+
+        @self.app.route_decorator('/ping', http_methods=['GET'])
+        def ping(req_params):
+            return 'pong'
+
+    def test_table_is_built_once_and_reused(self):
+        self.assertIsNone(self.app.dispatch_table)
+        self.app.process_request(function_url_event('/ping'))
+        table = self.app.dispatch_table
+        self.assertIn(('GET', '/ping'), table)
+        self.app.process_request(function_url_event('/ping'))
+        self.assertIs(self.app.dispatch_table, table)
+
+    def test_templated_routes_are_keyed_by_route(self):
+        @self.app.route_decorator('/users/{id}', http_methods=['GET'])
+        def user(req_params):
+            return req_params['id']
+
+        table = self.app.freeze()
+        self.assertIn(('GET', self.app.routes['/users/{id}']), table)
+
+    def test_adding_routes_or_middleware_invalidates_the_table(self):
+        self.app.freeze()
+
+        @self.app.route_decorator('/late', http_methods=['GET'])
+        def late(req_params):
+            return 'late'
+
+        self.assertIsNone(self.app.dispatch_table)
+        self.assertEqual(self.app.process_request(function_url_event('/late'))['body'], 'late')
+
+        self.app.use_middleware(Tag())
+        self.assertIsNone(self.app.dispatch_table)
+        self.assertEqual(self.app.process_request(function_url_event('/ping'))['headers']['X-Tag'], '1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+from PyLambdAPI import Response
+from PyLambdAPI.datastructures import Headers, MultiValueView
+from PyLambdAPI.lambda_flask import EVENT_ADAPTER, RawRequest, StaticResponse, StreamingResponse
+
+from events import function_url_event, quiet_app
+
+
+class TestCompactObjects(unittest.TestCase):
+    def test_per_request_objects_have_no_instance_dict(self):
+        request = EVENT_ADAPTER.process_event(function_url_event('/', query={'a': '1'}), 'function_url')
+        objects = [request, request.params(), request.query, request.headers, RawRequest({}, request),
+                   Response(200, 'x'), StreamingResponse(200, iter(())), StaticResponse(Response(200, 'x')),
+                   MultiValueView(), Headers()]
+        for obj in objects:
+            with self.subTest(type(obj).__name__):
+                self.assertFalse(hasattr(obj, '__dict__'))
+                with self.assertRaises(AttributeError):
+                    obj.unexpected = 1
+
+    def test_response_subclasses_without_slots_still_work(self):
+        class TaggedResponse(Response):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.tag = 'x'
+
+        app = quiet_app()
+
+        @app.route_decorator('/', http_methods=['GET'])
+        def handler(req_params):
+            return TaggedResponse(201, {'a': 1})
+
+        self.assertEqual(app.process_request(function_url_event('/')), {'statusCode': 201, 'body': {'a': 1}})
+
+
+if __name__ == '__main__':
+    unittest.main()
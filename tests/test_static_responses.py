@@ -0,0 +1,83 @@
+import json
+import unittest
+
+from PyLambdAPI import Middleware
+
+from events import alb_event, function_url_event, quiet_app, rest_event
+
+
+class Cors(Middleware):
+    def process_response(self, response):
+        response.headers = response.headers or {}
+        response.headers['Access-Control-Allow-Origin'] = '*'
+        return response
+
+
+class TestStaticResponses(unittest.TestCase):
+    def test_404_and_405_are_prebuilt_per_source(self):
+        for source, event in (('function_url', function_url_event('/nope')),
+                              ('api_gateway_proxy', rest_event('/nope')),
+                              ('alb', alb_event('/nope'))):
+            with self.subTest(source=source):
+                app = quiet_app(source=source)
+                app.static_route('/health', {'status': 'ok'})
+                result = app.process_request(event)
+                self.assertEqual(result['statusCode'], 404)
+                self.assertIs(app.process_request(event)['body'], result['body'])
+                if source == 'alb':
+                    self.assertEqual(result['statusDescription'], '404 Not Found')
+
+        app = quiet_app()
+        app.static_route('/health', {'status': 'ok'})
+        self.assertEqual(app.process_request(function_url_event('/health', method='POST'))['statusCode'], 405)
+
+    def test_static_route_serves_the_prebuilt_body(self):
+        app = quiet_app(source='api_gateway_proxy')
+        app.static_route('/health', {'status': 'ok'}, headers={'Cache-Control': 'no-cache'}, http_methods=['GET', 'HEAD'])
+        first = app.process_request(rest_event('/health'))
+        self.assertEqual(first['statusCode'], 200)
+        self.assertEqual(json.loads(first['body']), {'status': 'ok'})
+        self.assertEqual(first['headers']['Cache-Control'], 'no-cache')
+        # Serialized at registration, not per request
+        self.assertIs(app.process_request(rest_event('/health'))['body'], first['body'])
+        self.assertEqual(app.process_request(rest_event('/health', method='HEAD'))['statusCode'], 200)
+
+    def test_unhandled_errors_use_the_prebuilt_500(self):
+        app = quiet_app(source='http_api')
+
+        @app.route_decorator('/boom', http_methods=['GET'])
+        def boom(req_params):
+            raise RuntimeError('database password is hunter2')
+
+        with self.assertLogs('PyLambdAPI.lambda_flask', 'ERROR'):
+            result = app.process_request(function_url_event('/boom'))
+        self.assertEqual(result['statusCode'], 500)
+        self.assertEqual(json.loads(result['body']), {'error': 'Internal Server Error'})
+
+        app.register_static_response(500, {'message': 'Oops'})
+        with self.assertLogs('PyLambdAPI.lambda_flask', 'ERROR'):
+            result = app.process_request(function_url_event('/boom'))
+        self.assertEqual(json.loads(result['body']), {'message': 'Oops'})
+
+    def test_app_middleware_applies_to_static_routes(self):
+        app = quiet_app(middlewares=[Cors()])
+        app.static_route('/health', {'status': 'ok'})
+
+        @app.route_decorator('/x', http_methods=['GET'])
+        def x(req_params):
+            return 'x'
+
+        for path in ('/x', '/health', '/health'):
+            result = app.process_request(function_url_event(path))
+            self.assertEqual(result['headers']['Access-Control-Allow-Origin'], '*', path)
+
+    def test_middleware_changes_do_not_leak_into_the_shared_response(self):
+        app = quiet_app(middlewares=[Cors()])
+        response = app.static_route('/health', {'status': 'ok'})
+        app.process_request(function_url_event('/health'))
+        self.assertIsNone(response.headers)
+        self.assertNotIn('headers', response.json(source='function_url'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import asyncio
+import json
+import unittest
+
+from PyLambdAPI import Middleware, StreamingResponse
+from PyLambdAPI.streaming import PRELUDE_DELIMITER, LocalResponseStream, write_result
+
+from events import function_url_event, quiet_app
+
+
+class StreamHeader(Middleware):
+    def process_response(self, response):
+        response.headers = {**(response.headers or {}), 'X-Layer': '1'}
+        return response
+
+
+class TestStreamingRequests(unittest.TestCase):
+    def setUp(self):
+        self.app = quiet_app(middlewares=[StreamHeader()])
+        self.written = []
+
+        @self.app.route_decorator('/events', http_methods=['GET'])
+        def events(req_params):
+            def generate():
+                for i in range(3):
+                    # Each chunk is on the stream before the next one is produced
+                    self.written.append(len(self.stream.chunks))
+                    yield f'data: {i}\n\n'
+            return StreamingResponse(200, generate(), {'Content-Type': 'text/event-stream'}, cookies=['s=1'])
+
+        @self.app.route_decorator('/plain', http_methods=['GET'])
+        def plain(req_params):
+            return {'a': 1}
+
+        self.stream = LocalResponseStream()
+
+    def stream_request(self, path):
+        self.stream = LocalResponseStream()
+        self.app.process_streaming_request(function_url_event(path), self.stream)
+        return self.stream
+
+    def test_prelude_then_chunks(self):
+        stream = self.stream_request('/events')
+        self.assertEqual(stream.prelude, {'statusCode': 200, 'cookies': ['s=1'],
+                                          'headers': {'Content-Type': 'text/event-stream', 'X-Layer': '1'}})
+        self.assertEqual(stream.chunks[0].count(PRELUDE_DELIMITER), 1)
+        self.assertTrue(stream.chunks[0].endswith(PRELUDE_DELIMITER))
+        self.assertEqual(stream.chunks[1:], [b'data: 0\n\n', b'data: 1\n\n', b'data: 2\n\n'])
+        self.assertEqual(self.written, [0, 2, 3])
+        self.assertTrue(stream.closed)
+
+    def test_regular_results_go_out_in_one_piece(self):
+        stream = self.stream_request('/plain')
+        self.assertEqual(stream.prelude['statusCode'], 200)
+        self.assertEqual(stream.prelude['headers']['Content-Type'], 'application/json')
+        self.assertEqual(json.loads(stream.body), {'a': 1})
+        self.assertEqual(self.stream_request('/missing').prelude['statusCode'], 404)
+
+    def test_async_generators(self):
+        @self.app.route_decorator('/async', http_methods=['GET'])
+        async def handler(req_params):
+            async def generate():
+                for chunk in (b'a', 'b'):
+                    await asyncio.sleep(0)
+                    yield chunk
+            return StreamingResponse(200, generate())
+
+        self.assertEqual(self.stream_request('/async').body, b'ab')
+
+    def test_failure_before_the_first_chunk_is_a_500(self):
+        @self.app.route_decorator('/early', http_methods=['GET'])
+        def early(req_params):
+            def generate():
+                raise RuntimeError('no data')
+                yield b''
+            return StreamingResponse(200, generate())
+
+        with self.assertLogs('PyLambdAPI.lambda_flask', 'ERROR'):
+            stream = self.stream_request('/early')
+        self.assertEqual(stream.prelude['statusCode'], 500)
+        self.assertTrue(stream.closed)
+
+    def test_failure_after_the_prelude_truncates_the_body(self):
+        @self.app.route_decorator('/late', http_methods=['GET'])
+        def late(req_params):
+            def generate():
+                yield 'partial'
+                raise RuntimeError('connection lost')
+            return StreamingResponse(200, generate())
+
+        with self.assertLogs('PyLambdAPI.lambda_flask', 'ERROR'):
+            stream = self.stream_request('/late')
+        self.assertEqual(stream.prelude['statusCode'], 200)
+        self.assertEqual(stream.body, b'partial')
+        self.assertTrue(stream.closed)
+
+    def test_streaming_responses_are_joined_without_a_stream(self):
+        result = self.app.process_request(function_url_event('/events'))
+        self.assertEqual(result['body'], 'data: 0\n\ndata: 1\n\ndata: 2\n\n')
+        self.assertEqual(result['cookies'], ['s=1'])
+
+    def test_write_result_decodes_base64_bodies(self):
+        write_result(self.stream, {'statusCode': 200, 'body': 'AAE=', 'isBase64Encoded': True}, self.app.json_codec)
+        self.assertEqual(self.stream.body, b'\x00\x01')
+        self.stream.close()
+        with self.assertRaises(ValueError):
+            self.stream.write(b'late')
+
+    def test_invalid_chunks_are_rejected(self):
+        with self.assertRaises(ValueError):
+            StreamingResponse(200, iter([1])).json()
+
+
+if __name__ == '__main__':
+    unittest.main()
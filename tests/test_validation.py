@@ -0,0 +1,148 @@
+import json
+import unittest
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import List, Optional, TypedDict
+
+from PyLambdAPI import Middleware
+from PyLambdAPI.validation import compile_validator
+
+from events import function_url_event, quiet_app
+
+
+class CountRequests(Middleware):
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def process_response(self, response):
+        self.count += 1
+        response.headers = response.headers or {}
+        response.headers[f'X-Req-{self.count}'] = '1'
+        return response
+
+
+@dataclass
+class NewItem:
+    name: str
+    price: float
+    tags: List[str] = field(default_factory=list)
+
+
+class Filters(TypedDict, total=False):
+    page: int
+
+
+class TestValidation(unittest.TestCase):
+    def setUp(self):
+        self.app = quiet_app()
+        self.seen = []
+
+        @self.app.route_decorator('/items', http_methods=['GET'])
+        def list_items(req_params: {'page': int, 'ids': List[int], 'q': Optional[str], 'flag': bool}):
+            self.seen.append(dict(req_params))
+            return 'ok'
+
+        @self.app.route_decorator('/items', http_methods=['POST'])
+        def create(req_params: NewItem):
+            self.seen.append(dict(req_params))
+            return 'ok'
+
+        @self.app.route_decorator('/filtered', http_methods=['GET'])
+        def filtered(req_params: Filters):
+            self.seen.append(dict(req_params))
+            return 'ok'
+
+    def error(self, result):
+        self.assertEqual(result['statusCode'], 400)
+        return json.loads(result['body'])['error']
+
+    def test_query_values_are_coerced(self):
+        event = function_url_event('/items', query={'page': '2', 'ids': '1,2', 'flag': 'true'},
+                                   raw_query_string='page=2&ids=1&ids=2&flag=true')
+        result = self.app.process_request(event)
+        self.assertEqual(result['statusCode'], 200)
+        params = self.seen[0]
+        self.assertEqual((params['page'], params['ids'], params['flag']), (2, [1, 2], True))
+
+    def test_missing_and_invalid_fields(self):
+        missing = self.app.process_request(function_url_event('/items', query={'ids': '1', 'flag': '1'}))
+        self.assertEqual(self.error(missing), 'Missing parameter: page')
+        invalid = self.app.process_request(function_url_event('/items', query={'page': 'x', 'ids': '1', 'flag': '1'}))
+        self.assertEqual(self.error(invalid), 'Invalid parameter: page (expected int)')
+        self.assertEqual(self.seen, [])
+
+    def test_dataclass_body(self):
+        ok = self.app.process_request(function_url_event('/items', method='POST', body={'name': 'a', 'price': 3},
+                                                         headers={'content-type': 'application/json'}))
+        self.assertEqual(ok['statusCode'], 200)
+        self.assertEqual(self.seen[0]['price'], 3.0)
+        bad = self.app.process_request(function_url_event('/items', method='POST', body={'name': 'a'},
+                                                          headers={'content-type': 'application/json'}))
+        self.assertEqual(self.error(bad), 'Missing parameter: price')
+
+    def test_typed_dict_optional_keys(self):
+        self.assertEqual(self.app.process_request(function_url_event('/filtered'))['statusCode'], 200)
+
+    def test_error_response_is_not_shared_between_requests(self):
+        counter = CountRequests()
+        self.app.use_middleware(counter)
+        for _ in range(3):
+            result = self.app.process_request(function_url_event('/items', query={'ids': '1', 'flag': '1'}))
+        self.assertEqual(self.error(result), 'Missing parameter: page')
+        self.assertEqual(sorted(name for name in result['headers'] if name.startswith('X-Req')), ['X-Req-3'])
+
+
+class TestCompiledValidator(unittest.TestCase):
+    def test_nested_objects_report_the_full_path(self):
+        validate = compile_validator({'item': NewItem})
+        self.assertEqual(validate({'item': {'name': 'a', 'price': 'x'}}),
+                         'Invalid parameter: item.price (expected float)')
+        self.assertEqual(validate({'item': 'a'}), 'Invalid parameter: item (expected NewItem)')
+        params = {'item': {'name': 'a', 'price': '1.5', 'tags': ['x']}}
+        self.assertIsNone(validate(params))
+        self.assertEqual(params['item']['price'], 1.5)
+
+    def test_bools_and_floats(self):
+        validate = compile_validator({'flag': bool, 'ratio': float})
+        for flag, expected in (('yes', True), ('0', False), (True, True)):
+            params = {'flag': flag, 'ratio': 1}
+            self.assertIsNone(validate(params))
+            self.assertEqual(params, {'flag': expected, 'ratio': 1.0})
+        self.assertEqual(validate({'flag': 'maybe', 'ratio': 1}), 'Invalid parameter: flag (expected bool)')
+        self.assertEqual(validate({'flag': 'no', 'ratio': 1.5j}), 'Invalid parameter: ratio (expected float)')
+
+    def test_numbers_parse_like_path_converters(self):
+        validate = compile_validator({'count': int, 'ratio': float})
+        params = {'count': '-12', 'ratio': '2.5e1'}
+        self.assertIsNone(validate(params))
+        self.assertEqual(params, {'count': -12, 'ratio': 25.0})
+        for count, ratio in (('1_000', '1'), (' 1', '1'), ('1', 'nan'), ('1', '-inf'), ('1', '1_0.5'), ('1', ' 1.5')):
+            with self.subTest(count=count, ratio=ratio):
+                self.assertIsNotNone(validate({'count': count, 'ratio': ratio}))
+
+    def test_any_class_error_is_an_invalid_parameter(self):
+        app = quiet_app()
+
+        @app.route_decorator('/pay', http_methods=['GET'])
+        def pay(req_params: {'amount': Decimal}):
+            return str(req_params['amount'])
+
+        self.assertEqual(app.process_request(function_url_event('/pay', query={'amount': '1.10'}))['body'], '1.10')
+        result = app.process_request(function_url_event('/pay', query={'amount': 'abc'}))
+        self.assertEqual(result['statusCode'], 400)
+        self.assertEqual(json.loads(result['body'])['error'], 'Invalid parameter: amount (expected Decimal)')
+
+    def test_unannotated_handlers_are_not_validated(self):
+        self.assertIsNone(compile_validator(None))
+        app = quiet_app()
+
+        @app.route_decorator('/free', http_methods=['GET'])
+        def free(req_params):
+            return 'ok'
+
+        self.assertIsNone(app.routes['/free'].methods['GET'].validator)
+
+
+if __name__ == '__main__':
+    unittest.main()